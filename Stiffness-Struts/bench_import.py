@@ -0,0 +1,114 @@
+"""Import-time benchmark and guard for the SMApp modules.
+
+Every target is imported in a fresh interpreter, best of --repeat runs. The
+benchmark reports the wall time of the import and the slowest packages it
+pulled in (from python -X importtime). It then checks that no target loaded
+a package it must not load: the data path must stay free of matplotlib and
+scipy.signal, and a headless plot import must never touch Tk or Qt. The exit
+status is 1 when a check fails or a startup import is slower than
+--max-seconds, so the script can guard startup time before a long test.
+
+Usage:
+    python bench_import.py [--repeat 5] [--top 8] [--max-seconds 1.5] [--json out.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+GUI_PACKAGES = ['tkinter', '_tkinter', 'PyQt5', 'PyQt6', 'PySide2', 'PySide6']
+
+# (name, statement, extra environment, packages that must not be imported,
+#  whether --max-seconds applies)
+TARGETS = [
+    ('data path', 'import SMApp_postprocessing', {},
+     ['matplotlib', 'scipy.signal'] + GUI_PACKAGES, True),
+    ('batch', 'import smapp_batch', {}, ['matplotlib', 'scipy.signal'] + GUI_PACKAGES, True),
+    # For reference: what the first filter_data() call and the first plot add
+    ('data path + filter', 'import SMApp_postprocessing; from scipy.signal import savgol_filter', {},
+     ['matplotlib'] + GUI_PACKAGES, False),
+    ('plots (headless)', 'import smapp_plots', {'DISPLAY': None, 'WAYLAND_DISPLAY': None,
+                                                 'MPLBACKEND': None}, GUI_PACKAGES, False),
+]
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+print(json.dumps({{'seconds': seconds, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def run_target(statement, env_changes, importtime=False):
+    """Import in a fresh interpreter; return (result dict, -X importtime stderr)"""
+    env = dict(os.environ)
+    for key, value in env_changes.items():
+        if value is None:
+            env.pop(key, None)
+        else:
+            env[key] = value
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE.format(statement=statement)]
+    completed = subprocess.run(command, capture_output=True, text=True, env=env,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_packages(importtime_output, top):
+    """Top-level packages with the largest cumulative import time, in seconds"""
+    packages = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # A package's first import line has the largest cumulative time
+        package = name.strip().split('.')[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative) / 1e6)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def run_benchmark(repeat=5, top=8, max_seconds=None):
+    results = {}
+    failed = False
+    for name, statement, env_changes, forbidden, timed in TARGETS:
+        runs = [run_target(statement, env_changes)[0] for _ in range(repeat)]
+        best = min(run['seconds'] for run in runs)
+        _, importtime_output = run_target(statement, env_changes, importtime=True)
+        slowest = slowest_packages(importtime_output, top)
+        loaded = set(runs[0]['modules'])
+        leaks = [package for package in forbidden if package in loaded]
+        slow = timed and max_seconds is not None and best > max_seconds
+        failed = failed or bool(leaks) or slow
+
+        status = 'FAIL' if leaks or slow else 'ok'
+        print(f"{name:<20} {best:7.3f} s  {len(loaded):5d} modules  {status}")
+        for package, seconds in slowest:
+            print(f"    {package:<28} {seconds:7.3f} s")
+        if leaks:
+            print(f"    must not import: {', '.join(leaks)}")
+        if slow:
+            print(f"    slower than {max_seconds} s")
+        results[name] = {'statement': statement, 'seconds': best, 'modules': len(loaded),
+                         'forbidden_loaded': leaks, 'slowest': dict(slowest)}
+    return results, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark and guard SMApp import times.")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument('--top', type=int, default=8, help="Slowest packages listed per target")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Fail when a target takes longer than this to import")
+    parser.add_argument('--json', default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    results, failed = run_benchmark(args.repeat, args.top, args.max_seconds)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    sys.exit(1 if failed else 0)
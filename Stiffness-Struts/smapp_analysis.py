@@ -0,0 +1,127 @@
+"""Statistics of the force maximums, shared by the plots, console and batch mode.
+
+analyze_maximums() computes everything the SMApp reports about a series of
+maximum forces (max, min, mean, std, range, CV and the linear trend over the
+maximum number) in one set of vectorised NumPy reductions, and returns a
+MaximumStatistics that every output reads from.
+
+It also accepts a 2-D array with one recording per row, padded with NaN
+where a recording has fewer maximums, so a whole batch is analysed in one
+call.
+"""
+import numpy as np
+
+MIN_REGRESSION_POINTS = 2  # Fewer maximums than this give NaN statistics
+
+COLUMNS = [
+    ('maximum', 'Max Force (N)'),
+    ('mean', 'Avg Force (N)'),
+    ('std', 'Std Dev (N)'),
+    ('range', 'Range (N)'),
+    ('cv', 'CV (%)'),
+    ('slope', 'Trend (N/cycle)'),
+    ('intercept', 'Intercept (N)'),
+    ('r_squared', 'R2'),
+]
+
+
+class MaximumStatistics:
+    """Results of analyze_maximums(); scalars for one recording, arrays for a batch"""
+    def __init__(self, count, maximum, minimum, mean, std, slope, intercept, r_squared):
+        self.count = count
+        self.maximum = maximum
+        self.minimum = minimum
+        self.mean = mean
+        self.std = std
+        self.range = maximum - minimum
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.cv = std / mean * 100
+        self.slope = slope
+        self.intercept = intercept
+        self.r_squared = r_squared
+
+    def __len__(self):
+        return np.size(self.count)
+
+    def __getitem__(self, index):
+        """Statistics of one recording of a batch"""
+        return MaximumStatistics(*(np.asarray(getattr(self, name))[index] for name in
+                                   ('count', 'maximum', 'minimum', 'mean', 'std',
+                                    'slope', 'intercept', 'r_squared')))
+
+    def as_dict(self):
+        """Columns for a results table, keyed by their batch CSV header"""
+        return {header: getattr(self, name) for name, header in COLUMNS}
+
+    def summary_text(self):
+        """Short multi-line summary for the statistics box of the analysis plot"""
+        return (f"Max Force: {self.maximum:.2f} N\n"
+                f"Avg Force: {self.mean:.2f} N\n"
+                f"Std Dev: {self.std:.2f} N\n"
+                f"Trend: {self.slope:.3f} N/cycle\n"
+                f"R²: {self.r_squared:.4f}")
+
+    def report_lines(self):
+        """Full console report of one recording"""
+        return [
+            "\nAnalysis Results:",
+            f"Maximum Force: {self.maximum:.2f} N",
+            f"Average Force: {self.mean:.2f} N",
+            f"Standard Deviation: {self.std:.2f} N",
+            f"Range: {self.range:.2f} N",
+            f"Coefficient of Variation: {self.cv:.2f}%",
+            "\nRegression Results:",
+            f"Trend (slope): {self.slope:.3f} N/cycle",
+            f"Intercept: {self.intercept:.2f} N",
+            f"R²: {self.r_squared:.4f}",
+            f"Equation: Force = {self.slope:.3f} × Cycle + {self.intercept:.2f}",
+        ]
+
+
+def analyze_maximums(forces):
+    """Compute MaximumStatistics of a 1-D series or of each row of a NaN-padded 2-D array.
+
+    The trend is the least-squares line of force against maximum number
+    (0, 1, 2, ...), matching np.polyfit(x, forces, 1); std is the population
+    standard deviation, matching np.std().
+    """
+    y = np.asarray(forces, dtype=np.float64)
+    valid = ~np.isnan(y)
+    x = np.broadcast_to(np.arange(y.shape[-1], dtype=np.float64), y.shape)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        count = valid.sum(axis=-1)
+        y_zeroed = np.where(valid, y, 0.0)
+        mean = y_zeroed.sum(axis=-1) / count
+        x_mean = np.where(valid, x, 0.0).sum(axis=-1) / count
+        dy = np.where(valid, y - mean[..., None], 0.0)
+        dx = np.where(valid, x - x_mean[..., None], 0.0)
+        sxx = (dx * dx).sum(axis=-1)
+        syy = (dy * dy).sum(axis=-1)
+        sxy = (dx * dy).sum(axis=-1)
+
+        maximum = np.max(y, axis=-1, where=valid, initial=-np.inf)
+        minimum = np.min(y, axis=-1, where=valid, initial=np.inf)
+        std = np.sqrt(syy / count)
+        slope = sxy / sxx
+        intercept = mean - slope * x_mean
+        r_squared = sxy * sxy / (sxx * syy)
+
+    enough = count >= MIN_REGRESSION_POINTS
+    maximum, minimum, mean, std, slope, intercept, r_squared = (
+        np.where(enough, value, np.nan)
+        for value in (maximum, minimum, mean, std, slope, intercept, r_squared))
+    if y.ndim == 1:
+        count, maximum, minimum, mean, std, slope, intercept, r_squared = (
+            value.item() for value in
+            (count, maximum, minimum, mean, std, slope, intercept, r_squared))
+    return MaximumStatistics(count, maximum, minimum, mean, std, slope, intercept, r_squared)
+
+
+def stack_recordings(series):
+    """Stack 1-D series of different lengths into one NaN-padded 2-D array"""
+    width = max((len(values) for values in series), default=0)
+    stacked = np.full((len(series), width), np.nan)
+    for row, values in enumerate(series):
+        stacked[row, :len(values)] = values
+    return stacked
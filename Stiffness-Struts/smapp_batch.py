@@ -0,0 +1,162 @@
+"""Headless batch processing of a folder of stiffness-machine CSV files.
+
+Every CSV in the folder goes through load_and_process_csv -> filter_data ->
+find_maximums -> stiffness_table in a pool of worker processes, without any
+prompts or plot windows. The maximums of all files are then analysed
+together as one 2-D batch by smapp_analysis, and the results are collected
+into one table, batch_results/batch_results.csv, inside the folder. The
+per-cycle stiffness table of each file goes to batch_results/<file>_cycles.csv.
+
+Usage:
+    python smapp_batch.py <folder> [--figures] [--workers N] [--method M] [--order N] [--profile]
+                                   [--stream]
+
+--stream is for recordings too large to load: each file is read in chunks
+and filtered and scanned for argrelextrema maximums by smapp_streaming, in
+constant memory. Cycle segmentation, the stiffness table and figures need
+the whole recording and are skipped.
+
+--profile times every processing stage in the workers and writes the
+combined report to batch_results/batch_profile.json.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Workers never open windows; select Agg before matplotlib is first imported
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import pandas as pd
+
+import SMApp_postprocessing as smapp
+import smapp_instrumentation
+from smapp_analysis import analyze_maximums, stack_recordings
+from smapp_segments import build_segment_index
+from smapp_stiffness import ANGLE_UNIT, save_stiffness_table, stiffness_table
+
+RESULTS_FOLDER_NAME = 'batch_results'
+RESULTS_FILE_NAME = 'batch_results.csv'
+
+
+def process_file(file_path, results_folder, figures=False, order=50, method=smapp.PEAK_METHOD,
+                 profile=False, stream=False):
+    """Filter one file and find its maximums in a worker.
+
+    Returns (result row, maximum forces, instrumentation state or None); the
+    statistics are added to the row afterwards for all files at once.
+    """
+    if profile:
+        smapp_instrumentation.enable()  # Per file, so the state holds only this file
+    row = {'File': os.path.basename(file_path)}
+    forces = []
+    started = time.perf_counter()
+    try:
+        if stream:
+            max_points, row['Samples'] = stream_file(file_path, order)
+            row['Maximums'] = len(max_points)
+            forces = max_points['Force'].values
+            row['Seconds'] = round(time.perf_counter() - started, 3)
+            return row, forces, smapp_instrumentation.state() if profile else None
+
+        df = smapp.filter_data(smapp.load_and_process_csv(file_path))
+        # One segmentation serves both the maximums and the stiffness table
+        index = build_segment_index(df, 'valleys' if method == 'valleys' else 'angle')
+        max_points = smapp.find_maximums(df, method, order, index)
+        forces = max_points['Force'].values
+        row['Samples'] = len(df)
+        row['Maximums'] = len(max_points)
+
+        cycles = stiffness_table(df, index)
+        stem = os.path.splitext(row['File'])[0]
+        save_stiffness_table(cycles, os.path.join(results_folder, f"{stem}_cycles.csv"))
+        row['Cycles'] = len(cycles)
+        row[f'Mean Stiffness (N/{ANGLE_UNIT})'] = cycles[f'Stiffness (N/{ANGLE_UNIT})'].mean()
+        row[f'Mean Hysteresis (N*{ANGLE_UNIT})'] = cycles[f'Hysteresis (N*{ANGLE_UNIT})'].mean()
+
+        if figures:
+            from smapp_plots import (plot_force_maximums_analysis,
+                                     plot_time_series_with_maximums, plt)
+            fig, axes = plt.subplots(2, 1, figsize=(14, 12))
+            plot_time_series_with_maximums(df, max_points, axes[0])
+            # Row by row, so these equal the file's row of the batch statistics
+            plot_force_maximums_analysis(max_points, axes[1], analyze_maximums(forces))
+            fig.tight_layout()
+            fig.savefig(os.path.join(results_folder, f"{stem}.png"), dpi=100)
+            plt.close(fig)
+    except Exception as e:
+        row['Error'] = f"{type(e).__name__}: {e}"
+    row['Seconds'] = round(time.perf_counter() - started, 3)
+    return row, forces, smapp_instrumentation.state() if profile else None
+
+
+def stream_file(file_path, order):
+    """Return (maximums, samples) of a recording read and filtered chunk by chunk"""
+    from smapp_streaming import stream_force_maximums  # Loads scipy.signal
+    samples = 0
+
+    def count(start, values):
+        nonlocal samples
+        samples += len(values)
+
+    with smapp_instrumentation.stage('stream') as timer:
+        max_points = stream_force_maximums(file_path, order=order, on_filtered=count)
+        timer.items = samples
+    return max_points, samples
+
+
+def run_batch(folder, figures=False, workers=None, order=50, method=smapp.PEAK_METHOD,
+              profile=False, stream=False):
+    csv_files = sorted(f for f in os.listdir(folder) if f.endswith(".csv"))
+    if not csv_files:
+        print(f"No CSV files found in {folder}")
+        return None
+
+    results_folder = os.path.join(folder, RESULTS_FOLDER_NAME)
+    os.makedirs(results_folder, exist_ok=True)
+    if profile:
+        smapp_instrumentation.enable(os.path.join(results_folder, 'batch_profile.json'))
+
+    if stream and (figures or method != 'extrema'):
+        print("--stream finds argrelextrema maximums only; "
+              "segmentation, stiffness and figures are skipped.")
+    print(f"Processing {len(csv_files)} files...")
+    rows = []
+    forces = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_file, os.path.join(folder, f), results_folder,
+                                   figures, order, method, profile, stream): f
+                   for f in csv_files}
+        for future in as_completed(futures):
+            row, file_forces, file_profile = future.result()
+            if file_profile is not None:
+                smapp_instrumentation.merge(file_profile)
+            status = row.get('Error') or f"{row['Maximums']} maximums"
+            print(f"{row['File']}: {status} ({row['Seconds']:.1f} s)")
+            rows.append(row)
+            forces.append(file_forces)
+
+    # One vectorised pass over every file's maximums
+    stats = analyze_maximums(stack_recordings(forces))
+    results = pd.concat([pd.DataFrame(rows), pd.DataFrame(stats.as_dict())], axis=1)
+    results = results.sort_values('File').reset_index(drop=True)
+    results_path = os.path.join(results_folder, RESULTS_FILE_NAME)
+    results.to_csv(results_path, index=False)
+    print(f"Results written to {results_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process every stiffness CSV in a folder.")
+    parser.add_argument('folder', help="Folder containing the CSV files")
+    parser.add_argument('--figures', action='store_true', help="Save analysis figures as PNG")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--method', choices=['angle', 'valleys', 'extrema'], default=smapp.PEAK_METHOD,
+                        help="Peak detection: per cycle segment (angle, valleys) or argrelextrema")
+    parser.add_argument('--order', type=int, default=50, help="Peak detection order for --method extrema")
+    parser.add_argument('--profile', action='store_true', help="Write a stage timing report")
+    parser.add_argument('--stream', action='store_true',
+                        help="Process files chunk by chunk in constant memory (argrelextrema only)")
+    args = parser.parse_args()
+    run_batch(args.folder, figures=args.figures, workers=args.workers, order=args.order,
+              method=args.method, profile=args.profile, stream=args.stream)
@@ -0,0 +1,116 @@
+"""On-disk cache of SMApp analysis results, including manual point edits.
+
+Entries are keyed by the SHA-256 of the CSV content plus the filter and peak
+parameters, so a renamed or copied recording still hits the cache while an
+edited one does not. Each entry stores the filtered force signal, the
+automatically detected maxima and the user's edits (manual_points and
+deleted_points) from ManualPointEditor.
+
+Content hashes are remembered per (path, size, mtime), so an unchanged file
+is only hashed once. The cache shares CACHE_FOLDER with the loader's binary
+sidecars, and the least recently used files are evicted once the folder
+grows beyond MAX_CACHE_BYTES (see smapp_loader.evict_cache). Hash index
+entries are dropped when their file changes or their analyses are evicted.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from smapp_loader import CACHE_FOLDER, evict_cache
+
+HASH_BLOCK_SIZE = 1 << 20
+HASH_INDEX_NAME = 'content_hashes.json'  # Must end in smapp_loader.INDEX_EXTENSION
+ANALYSIS_EXTENSION = '.analysis.npz'
+
+
+def _load_hash_index():
+    try:
+        with open(os.path.join(CACHE_FOLDER, HASH_INDEX_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hash_index(index):
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    with open(os.path.join(CACHE_FOLDER, HASH_INDEX_NAME), 'w') as file:
+        json.dump(index, file)
+
+
+def content_hash(file_path):
+    """SHA-256 of the file content, remembered for unchanged files"""
+    stat = os.stat(file_path)
+    path_key = os.path.abspath(file_path) + '|'
+    stat_key = f"{path_key}{stat.st_size}|{stat.st_mtime_ns}"
+    index = _load_hash_index()
+    if stat_key in index:
+        return index[stat_key]
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    # Entries for earlier versions of this file can never match again
+    index = {key: value for key, value in index.items() if not key.startswith(path_key)}
+    index[stat_key] = digest.hexdigest()
+    _save_hash_index(index)
+    return index[stat_key]
+
+
+def prune_hash_index():
+    """Drop hash index entries that no cached analysis refers to any more"""
+    index = _load_hash_index()
+    cached = {name[:32] for name in os.listdir(CACHE_FOLDER) if name.endswith(ANALYSIS_EXTENSION)}
+    kept = {key: value for key, value in index.items() if value[:32] in cached}
+    if len(kept) < len(index):
+        _save_hash_index(kept)
+
+
+def analysis_cache_path(file_path, window_size, poly_order, order, peak_method='extrema'):
+    key = f"{content_hash(file_path)[:32]}-w{window_size}-p{poly_order}-o{order}"
+    if peak_method != 'extrema':
+        key += f"-{peak_method}"
+    return os.path.join(CACHE_FOLDER, key + ANALYSIS_EXTENSION)
+
+
+def load_analysis(file_path, window_size, poly_order, order, peak_method='extrema'):
+    """Return the cached analysis as a dict, or None on a cache miss.
+
+    Keys: 'filtered' (array), 'max_points' (DataFrame with Time/Force),
+    'manual_points' (list of dicts) and 'deleted_points' (set of indices).
+    """
+    path = analysis_cache_path(file_path, window_size, poly_order, order, peak_method)
+    try:
+        with np.load(path) as data:
+            entry = {
+                'filtered': data['filtered'],
+                'max_points': pd.DataFrame({'Time': data['max_times'],
+                                            'Force': data['max_forces']}),
+                'manual_points': [{'Time': int(t), 'Force': float(f)} for t, f in
+                                  zip(data['manual_times'], data['manual_forces'])],
+                'deleted_points': set(data['deleted'].tolist()),
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+    os.utime(path)  # Mark as recently used for eviction
+    return entry
+
+
+def save_analysis(file_path, window_size, poly_order, order, filtered, max_points,
+                  manual_points=(), deleted_points=(), peak_method='extrema'):
+    path = analysis_cache_path(file_path, window_size, poly_order, order, peak_method)
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    temp_path = path + '.tmp.npz'
+    np.savez(temp_path,
+             filtered=np.asarray(filtered),
+             max_times=max_points['Time'].to_numpy(),
+             max_forces=max_points['Force'].to_numpy(),
+             manual_times=np.array([p['Time'] for p in manual_points], dtype=np.int64),
+             manual_forces=np.array([p['Force'] for p in manual_points], dtype=float),
+             deleted=np.array(sorted(deleted_points), dtype=np.int64))
+    os.replace(temp_path, path)
+    evict_cache(keep=path)
+    prune_hash_index()
@@ -0,0 +1,24 @@
+"""Stage timers and counters for SMApp post-processing.
+
+Loading, filtering, peak detection and the stiffness fit each time
+themselves with stage(). Nothing is collected until enable() is called.
+smapp_batch workers collect on their own and send state() back to the
+parent, which merge()s them into one report.
+
+The implementation is shared with the TARA logger. The two folders are
+separate script folders that cannot import each other, so this module
+loads ../TARA/instrumentation.py by path and takes its place in
+sys.modules. smapp_instrumentation.enabled, stage(), state() and merge()
+are therefore the shared module's own, and there is one copy to maintain.
+"""
+import importlib.util
+import os
+import sys
+
+SHARED_PATH = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                                            'TARA', 'instrumentation.py'))
+
+_spec = importlib.util.spec_from_file_location(__name__, SHARED_PATH)
+_shared = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _shared
+_spec.loader.exec_module(_shared)
@@ -0,0 +1,132 @@
+"""Chunked CSV loading with a memory-mapped binary cache for SMApp recordings.
+
+The first load of a recording streams the CSV in CHUNK_ROWS pieces as
+float32 and writes the (Force, Angle) pairs to a raw binary sidecar in
+CACHE_FOLDER. Later loads of the same, unchanged file memory-map that
+sidecar instead of parsing the CSV again. The sidecar name includes the
+source path, size and modification time, so an edited CSV is re-parsed.
+Whenever a sidecar is written, the least recently used files in
+CACHE_FOLDER (sidecars and smapp_cache analyses) are evicted once the
+folder grows beyond MAX_CACHE_BYTES.
+"""
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import smapp_instrumentation
+
+CSV_SKIP_ROWS = 25  # Header lines written by the stiffness machine
+CHUNK_ROWS = 500000  # Rows parsed per chunk; bounds peak memory while parsing
+CACHE_FOLDER = os.path.join(os.path.expanduser('~'), '.smapp_cache')
+CACHE_EXTENSION = '.f32'
+MAX_CACHE_BYTES = 4 * 1024 ** 3  # Total size of CACHE_FOLDER before eviction
+INDEX_EXTENSION = '.json'  # Small index files in CACHE_FOLDER, never evicted
+COLUMNS = ['Force', 'Angle']
+
+
+def cache_path_for(file_path):
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(CACHE_FOLDER, f"{stem}-{digest}{CACHE_EXTENSION}")
+
+
+def iter_csv_chunks(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield (n, 2) float32 arrays of (|Force|, Angle) parsed from the CSV"""
+    reader = pd.read_csv(file_path, skiprows=CSV_SKIP_ROWS, header=None,
+                         usecols=[0, 1], names=COLUMNS, dtype=np.float32,
+                         chunksize=chunk_rows)
+    started = time.perf_counter()
+    for chunk in reader:
+        values = chunk.to_numpy(dtype=np.float32)
+        np.abs(values[:, 0], out=values[:, 0])
+        smapp_instrumentation.record('read_csv', time.perf_counter() - started, len(values))
+        yield values
+        started = time.perf_counter()  # Time spent by the consumer is not parsing
+
+
+def build_cache(file_path, cache_path, chunk_rows=CHUNK_ROWS):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        for values in iter_csv_chunks(file_path, chunk_rows):
+            values.tofile(file)
+    os.replace(temp_path, cache_path)  # Never leave a half-written cache behind
+
+
+def open_cached(file_path, use_cache=True):
+    """Return a memory-mapped (n, 2) float32 array of (|Force|, Angle).
+
+    Returns None when caching is disabled or the cache cannot be written.
+    """
+    if not use_cache:
+        return None
+    cache_path = cache_path_for(file_path)
+    if os.path.exists(cache_path):
+        os.utime(cache_path)  # Mark as recently used for cache eviction
+    else:
+        try:
+            build_cache(file_path, cache_path)
+        except OSError as e:
+            print(f"Could not write cache for {file_path}: {e}")
+            return None
+        evict_cache(keep=cache_path)
+    if os.path.getsize(cache_path) == 0:
+        return np.empty((0, 2), dtype=np.float32)
+    # Copy-on-write, so later in-place edits never reach the cache file
+    return np.memmap(cache_path, dtype=np.float32, mode='c').reshape(-1, 2)
+
+
+def evict_cache(max_bytes=MAX_CACHE_BYTES, keep=None):
+    """Delete least recently used cache files until the folder fits in max_bytes.
+
+    `keep` (a path) is never deleted, e.g. the sidecar about to be mapped.
+    """
+    entries = []
+    for name in os.listdir(CACHE_FOLDER):
+        path = os.path.join(CACHE_FOLDER, name)
+        if name.endswith(INDEX_EXTENSION) or path == keep:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # Removed by another process meanwhile
+        entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if keep is not None and os.path.exists(keep):
+        total += os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass  # In use by another process; try again next time
+
+
+def iter_force_angle_chunks(file_path, chunk_rows=CHUNK_ROWS, use_cache=True):
+    """Yield (n, 2) float32 chunks of (|Force|, Angle) in recording order"""
+    data = open_cached(file_path, use_cache)
+    if data is None:
+        yield from iter_csv_chunks(file_path, chunk_rows)
+        return
+    for start in range(0, len(data), chunk_rows):
+        yield data[start:start + chunk_rows]
+
+
+def load_and_process_csv(file_path, use_cache=True):
+    with smapp_instrumentation.stage('load') as timer:
+        data = open_cached(file_path, use_cache)
+        if data is None:
+            chunks = list(iter_csv_chunks(file_path))
+            data = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.float32)
+        df = pd.DataFrame(data, columns=COLUMNS, copy=False)
+        df['Time'] = np.arange(len(df))
+        timer.items = len(df)
+    return df
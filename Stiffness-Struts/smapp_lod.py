@@ -0,0 +1,84 @@
+"""Level-of-detail plotting for long SMApp time series.
+
+A min/max pyramid is built once per signal. Whenever the x-range of the axes
+changes, only the visible part is redrawn at the coarsest level that still
+gives a few bins per screen pixel. Because each bin keeps both its minimum
+and its maximum, peaks stay visually exact while the number of drawn points
+stays roughly constant at any zoom level.
+"""
+import math
+
+import numpy as np
+
+LOD_FACTOR = 4  # Samples merged per bin from one pyramid level to the next
+LOD_MIN_POINTS = 50000  # Shorter signals are plotted directly
+BINS_PER_PIXEL = LOD_FACTOR  # Bin budget per pixel; levels step by LOD_FACTOR, so at least one bin per pixel
+
+
+class MinMaxPyramid:
+    """Min/max decimation levels of a uniformly sampled signal"""
+    def __init__(self, y, factor=LOD_FACTOR):
+        self.factor = factor
+        self.y = np.asarray(y)
+        self.levels = []  # (bin size, mins, maxs), finest first
+        mins = maxs = self.y
+        bin_size = 1
+        while len(mins) > 1:
+            starts = np.arange(0, len(mins), factor)
+            mins = np.minimum.reduceat(mins, starts)
+            maxs = np.maximum.reduceat(maxs, starts)
+            bin_size *= factor
+            self.levels.append((bin_size, mins, maxs))
+
+    def query(self, start, stop, max_bins):
+        """Return x, y to draw for samples [start, stop) using at most ~max_bins bins"""
+        start = max(int(start), 0)
+        stop = min(int(stop), len(self.y))
+        if stop <= start:
+            return np.empty(0), np.empty(0)
+        if stop - start <= 2 * max_bins:
+            return np.arange(start, stop), self.y[start:stop]
+
+        for bin_size, mins, maxs in self.levels:
+            if (stop - start) / bin_size <= max_bins:
+                break
+        first = start // bin_size
+        last = -(-stop // bin_size)
+        bin_starts = np.arange(first, last) * bin_size
+        # Each bin is drawn as a vertical stroke from its minimum to its maximum
+        x = np.repeat(bin_starts + (bin_size - 1) / 2, 2)
+        y = np.empty(2 * (last - first), dtype=mins.dtype)
+        y[0::2] = mins[first:last]
+        y[1::2] = maxs[first:last]
+        return x, y
+
+
+class DecimatedLine:
+    """A Line2D on `ax` that redraws y[i] against i at the current zoom level"""
+    def __init__(self, ax, y, **plot_kwargs):
+        self.ax = ax
+        self.pyramid = MinMaxPyramid(y)
+        self.line, = ax.plot([], [], **plot_kwargs)
+
+        y = self.pyramid.y
+        if len(y):
+            ax.update_datalim([(0, np.min(y)), (len(y) - 1, np.max(y))])
+            ax.autoscale_view()
+
+        # Lambdas keep this object alive for as long as the axes exist
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.update())
+        self.update()
+
+    def update(self):
+        xmin, xmax = self.ax.get_xlim()
+        max_bins = max(int(self.ax.bbox.width * BINS_PER_PIXEL), 1)
+        x, y = self.pyramid.query(math.floor(xmin), math.ceil(xmax) + 1, max_bins)
+        self.line.set_data(x, y)
+
+
+def plot_series(ax, y, **plot_kwargs):
+    """Plot y against sample index, decimating long signals. Returns the Line2D."""
+    if len(y) < LOD_MIN_POINTS:
+        return ax.plot(np.arange(len(y)), y, **plot_kwargs)[0]
+    return DecimatedLine(ax, y, **plot_kwargs).line
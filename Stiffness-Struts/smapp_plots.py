@@ -0,0 +1,290 @@
+"""Interactive point editor and analysis plots for SMApp recordings.
+
+Kept apart from the data path in SMApp_postprocessing so matplotlib is only
+imported when something is shown. Without a display (Linux with neither
+DISPLAY nor WAYLAND_DISPLAY set, or MPLBACKEND=Agg) the Agg backend is
+selected before pyplot is imported, so Tk and Qt are never loaded; figures
+are then saved instead of shown.
+"""
+import os
+import sys
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+
+def is_headless():
+    """True when figures cannot be shown: Agg was requested or there is no display"""
+    backend = os.environ.get('MPLBACKEND', '')
+    if backend:
+        return backend.lower() == 'agg'
+    if sys.platform.startswith('linux'):
+        return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return False
+
+
+HEADLESS = is_headless()
+if HEADLESS:
+    matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import matplotlib.widgets as widgets
+
+from smapp_analysis import analyze_maximums
+from smapp_lod import plot_series
+
+ORIGINAL = 0  # Point source codes used by ManualPointEditor
+MANUAL = 1
+MAX_POINT_LABELS = 150  # Number labels are only drawn when this few points are in view
+
+class ManualPointEditor:
+    def __init__(self, fig, ax, df, max_points, manual_points=None, deleted_points=None):
+        self.fig = fig
+        self.ax = ax
+        self.df = df
+        self.max_points = max_points.copy()
+        self.manual_points = []
+        self.deleted_points = set()
+        
+        # Normalisation for the force axis of the click distance, computed once
+        self.force_scale = float(np.max(df['Force_filtered'].values))
+        
+        # Current points as arrays sorted by time. For each point, `sources`
+        # says whether it is an original or a manual point and `refs` holds its
+        # index in self.max_points or self.manual_points.
+        times = self.max_points['Time'].to_numpy(dtype=float)
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        self.forces = self.max_points['Force'].to_numpy(dtype=float)[order]
+        self.sources = np.full(len(order), ORIGINAL, dtype=np.int8)
+        self.refs = order.astype(np.int64)
+        
+        # Restore edits from an earlier session
+        if deleted_points:
+            self.deleted_points = set(deleted_points)
+            keep = ~np.isin(self.refs, list(self.deleted_points))
+            self.times = self.times[keep]
+            self.forces = self.forces[keep]
+            self.sources = self.sources[keep]
+            self.refs = self.refs[keep]
+        for point in manual_points or []:
+            self.insert_manual_point(point['Time'], point['Force'])
+        
+        # All points are drawn as one collection plus a small pool of labels
+        self.points_artist = ax.scatter([], [], color='red', s=100, zorder=5)
+        self.point_texts = []
+        
+        # Connect mouse events
+        self.cid_click = fig.canvas.mpl_connect('button_press_event', self.onclick)
+        self.cid_xlim = ax.callbacks.connect('xlim_changed', lambda ax: self.update_labels())
+        
+        # Add "Done" button
+        axdone = plt.axes([0.81, 0.01, 0.1, 0.05])
+        self.btn_done = widgets.Button(axdone, 'Done')
+        self.btn_done.on_clicked(self.on_done)
+        
+        # Add instructions text
+        plt.figtext(0.5, 0.01, "Left click: Add point | Right click: Delete nearest point | Click 'Done' when finished", 
+                   ha="center", fontsize=11, bbox={"facecolor":"orange", "alpha":0.3, "pad":5})
+        
+        # Initial plot of points
+        self.update_point_display()
+        
+    def onclick(self, event):
+        if event.inaxes == self.ax:
+            if event.button == 1:  # Left click - add point
+                self.add_point(event)
+            elif event.button == 3:  # Right click - delete point
+                self.delete_nearest_point(event)
+    
+    def add_point(self, event):
+        x = int(round(event.xdata))
+        if 0 <= x < len(self.df):
+            y = float(self.df['Force_filtered'].iat[x])
+            self.insert_manual_point(x, y)
+            print(f"Added point at Time={x}, Force={y:.2f}")
+            self.update_point_display()
+    
+    def insert_manual_point(self, x, y):
+        self.manual_points.append({'Time': x, 'Force': y})
+        
+        # Insert after any points with the same time, keeping the arrays sorted
+        pos = np.searchsorted(self.times, x, side='right')
+        self.times = np.insert(self.times, pos, x)
+        self.forces = np.insert(self.forces, pos, y)
+        self.sources = np.insert(self.sources, pos, MANUAL)
+        self.refs = np.insert(self.refs, pos, len(self.manual_points) - 1)
+    
+    def find_nearest_point(self, click_x, click_y):
+        """Return the array position of the point nearest to the click, or -1"""
+        if len(self.times) == 0:
+            return -1
+        
+        def distances(lo, hi):
+            return np.hypot(self.times[lo:hi] - click_x,
+                            (self.forces[lo:hi] - click_y) / self.force_scale)
+        
+        # The points on either side of the click in time bound the best
+        # distance; only points within that time span can be any closer.
+        pos = np.searchsorted(self.times, click_x)
+        lo = max(pos - 1, 0)
+        hi = min(pos + 1, len(self.times))
+        bound = distances(lo, hi).min()
+        lo = np.searchsorted(self.times, click_x - bound, side='left')
+        hi = np.searchsorted(self.times, click_x + bound, side='right')
+        return lo + int(np.argmin(distances(lo, hi)))
+    
+    def delete_nearest_point(self, event):
+        nearest = self.find_nearest_point(event.xdata, event.ydata)
+        if nearest < 0:
+            return
+        
+        source = self.sources[nearest]
+        ref = int(self.refs[nearest])
+        
+        # Delete the nearest point
+        if source == ORIGINAL:
+            self.deleted_points.add(ref)
+            point = self.max_points.iloc[ref]
+            print(f"Deleted original point at Time={point['Time']}, Force={point['Force']:.2f}")
+        else:
+            point = self.manual_points.pop(ref)
+            # Manual points after the removed one move down by one in the list
+            self.refs[(self.sources == MANUAL) & (self.refs > ref)] -= 1
+            print(f"Deleted manual point at Time={point['Time']}, Force={point['Force']:.2f}")
+        
+        self.times = np.delete(self.times, nearest)
+        self.forces = np.delete(self.forces, nearest)
+        self.sources = np.delete(self.sources, nearest)
+        self.refs = np.delete(self.refs, nearest)
+        
+        self.update_point_display()
+    
+    def get_all_current_points(self):
+        # Original points (minus deleted) and manual points, sorted by time
+        return [{'Time': t, 'Force': f} for t, f in zip(self.times.tolist(), self.forces.tolist())]
+    
+    def update_labels(self):
+        # Number labels are only shown when few enough points are in view
+        xmin, xmax = self.ax.get_xlim()
+        lo = np.searchsorted(self.times, xmin, side='left')
+        hi = np.searchsorted(self.times, xmax, side='right')
+        if hi - lo > MAX_POINT_LABELS:
+            lo = hi
+        
+        while len(self.point_texts) < hi - lo:
+            self.point_texts.append(self.ax.text(0, 0, '', fontsize=10, ha='center',
+                                                 va='bottom', zorder=6))
+        for i, text in enumerate(self.point_texts):
+            if i < hi - lo:
+                text.set_position((self.times[lo + i], self.forces[lo + i]))
+                text.set_text(f"{lo + i + 1}")
+                text.set_visible(True)
+            else:
+                text.set_visible(False)
+    
+    def update_point_display(self):
+        self.points_artist.set_offsets(np.column_stack((self.times, self.forces)))
+        self.update_labels()
+        self.fig.canvas.draw_idle()
+    
+    def on_done(self, event):
+        plt.close(self.fig)
+    
+    def get_updated_max_points(self):
+        if len(self.times) == 0:
+            return pd.DataFrame(columns=['Time', 'Force'])
+        
+        return pd.DataFrame({'Time': self.times, 'Force': self.forces})
+
+def interactive_maximums_selection(df, max_points, manual_points=None, deleted_points=None):
+    return run_point_editor(df, max_points, manual_points, deleted_points).get_updated_max_points()
+
+def run_point_editor(df, max_points, manual_points=None, deleted_points=None):
+    """Show the editing window until it is closed and return the editor"""
+    fig, ax = plt.subplots(figsize=(14, 8))
+    
+    # Plot raw and filtered force data
+    # Long recordings are drawn decimated to the current zoom level
+    plot_series(ax, df['Force'].values, alpha=0.3, label='Raw Force', color='lightgreen')
+    plot_series(ax, df['Force_filtered'].values, label='Filtered Force', color='green')
+
+    ax.set_xlabel('Time (samples)')
+    ax.set_ylabel('Force (N)', color='green')
+    ax.set_title('Force Time Series - Edit Maximum Points')
+    ax.grid(True)
+    ax.legend(loc='upper left')
+    
+    point_editor = ManualPointEditor(fig, ax, df, max_points, manual_points, deleted_points)
+    plt.tight_layout()
+    plt.subplots_adjust(bottom=0.15)  # Make room for the button and instructions
+    plt.show()
+    
+    return point_editor
+
+def plot_time_series_with_maximums(df, max_points, ax):
+    # Plot raw and filtered force data
+    # Long recordings are drawn decimated to the current zoom level
+    plot_series(ax, df['Force'].values, alpha=0.3, label='Raw Force', color='lightgreen')
+    plot_series(ax, df['Force_filtered'].values, label='Filtered Force', color='green')
+
+    # Plot detected maximums
+    if not max_points.empty:
+        ax.scatter(max_points['Time'], max_points['Force'], color='red', s=100, label='Force Maximums')
+        for i, point in max_points.iterrows():
+            ax.text(point['Time'], point['Force'], f"{i + 1}", fontsize=10, ha='center', va='bottom')
+
+    ax.set_xlabel('Time (samples)')
+    ax.set_ylabel('Force (N)', color='green')
+    ax.set_title('Force Time Series with Force Maximums')
+    ax.grid(True)
+    ax.legend(loc='upper left')
+
+def plot_force_maximums_analysis(max_points, ax, stats=None):
+    if len(max_points) < 2:
+        ax.text(0.5, 0.5, "Not enough maximum points detected for analysis",
+                transform=ax.transAxes, fontsize=14, ha='center', va='center')
+        return
+
+    # Plot force maximums
+    y = max_points['Force'].values
+    x = np.arange(len(y))
+    if stats is None:
+        stats = analyze_maximums(y)
+    
+    # Create bar chart of force values
+    ax.bar(x, y, color='green', alpha=0.7)
+    
+    # Add data points and connecting line
+    ax.plot(x, y, 'ro-', linewidth=2)
+    
+    # Add regression line
+    regression_line = stats.slope * x + stats.intercept
+    ax.plot(x, regression_line, 'b--', linewidth=2, 
+            label=f'Regression: {stats.slope:.2f}x + {stats.intercept:.2f}')
+    
+    # Add force values above bars
+    for i, val in enumerate(y):
+        ax.text(i, val + stats.maximum*0.02, f"{val:.2f}N", ha='center')
+
+    # Add statistics text box
+    ax.text(0.05, 0.95, stats.summary_text(),
+            transform=ax.transAxes, fontsize=12, verticalalignment='top', 
+            bbox=dict(facecolor='white', alpha=0.7))
+
+    ax.set_xlabel('Maximum Point Number')
+    ax.set_ylabel('Force (N)')
+    ax.set_xticks(x)
+    ax.set_xticklabels([f"{i+1}" for i in range(len(y))])
+    ax.grid(True, axis='y')
+    ax.legend()
+
+def show_or_save(fig, path):
+    """Show the figure, or save it to path when there is no display"""
+    if HEADLESS:
+        fig.savefig(path, dpi=100)
+        plt.close(fig)
+        print(f"Figure saved to {path}")
+    else:
+        plt.show()
@@ -0,0 +1,164 @@
+"""Cycle segmentation of SMApp recordings.
+
+Instead of searching the whole signal for local maxima, the recording is cut
+once into loading segments, and per-segment values are then computed with
+ufunc.reduceat over those boundaries. Every step is a handful of vectorised
+passes over the data, independent of any window size.
+
+Boundaries come from the Angle channel: a segment starts at each zero
+crossing of the angle. A hysteresis band of ANGLE_HYSTERESIS times the angle
+amplitude ignores noise around zero, so only real swings start a segment.
+Since the loader keeps |Force|, each swing to either side is one loading
+segment with one force peak. Recordings without a usable Angle channel are
+cut at force valleys instead: the lowest point between two excursions
+through the VALLEY_LOW / VALLEY_HIGH bands of the force range.
+"""
+import numpy as np
+import pandas as pd
+
+import smapp_instrumentation
+
+ANGLE_HYSTERESIS = 0.1  # Fraction of the angle amplitude that must be crossed to switch side
+VALLEY_LOW = 0.3  # Force valleys lie below this fraction of the force range
+VALLEY_HIGH = 0.7  # and are separated by excursions above this fraction
+AMPLITUDE_PERCENTILE = 99  # Robust amplitude estimate, ignores isolated spikes
+MIN_SEGMENTS = 2  # Fall back to force valleys when the angle gives fewer segments
+
+
+class SegmentIndex:
+    """Sample boundaries of the segments of a recording.
+
+    Segment i covers samples bounds[i] to bounds[i + 1] - 1. Data before the
+    first and after the last boundary belongs to incomplete segments and is
+    not part of any segment.
+    """
+    def __init__(self, bounds, method):
+        self.bounds = np.asarray(bounds, dtype=np.int64)
+        self.method = method
+
+    def __len__(self):
+        return max(len(self.bounds) - 1, 0)
+
+    @property
+    def starts(self):
+        return self.bounds[:-1]
+
+    @property
+    def ends(self):
+        return self.bounds[1:]
+
+    def reduce(self, ufunc, values):
+        """Apply ufunc.reduceat over every segment, e.g. np.maximum or np.add"""
+        if not len(self):
+            return np.empty(0, dtype=np.asarray(values).dtype)
+        first = self.bounds[0]
+        return ufunc.reduceat(values[first:self.bounds[-1]], self.starts - first)
+
+    def maximum(self, values):
+        return self.reduce(np.maximum, values)
+
+    def minimum(self, values):
+        return self.reduce(np.minimum, values)
+
+    def argmax(self, values):
+        """Sample index of the first maximum of each segment"""
+        return self._arg_extreme(values, np.maximum)
+
+    def argmin(self, values):
+        """Sample index of the first minimum of each segment"""
+        return self._arg_extreme(values, np.minimum)
+
+    def _arg_extreme(self, values, ufunc):
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        first = self.bounds[0]
+        part = values[first:self.bounds[-1]]
+        offsets = self.starts - first
+        extremes = ufunc.reduceat(part, offsets)
+        hits = np.flatnonzero(part == np.repeat(extremes, np.diff(self.bounds)))
+        return hits[np.searchsorted(hits, offsets)] + first
+
+
+def _hysteresis_changes(state):
+    """Indices where a +1/-1/0 state array first reaches the opposite side.
+
+    Zeros (inside the band) never count as a change. Returns (indices, new
+    state at each index).
+    """
+    settled = np.flatnonzero(state)
+    sides = state[settled]
+    changed = np.flatnonzero(sides[1:] != sides[:-1]) + 1
+    return settled[changed], sides[changed]
+
+
+def angle_boundaries(angle, hysteresis=ANGLE_HYSTERESIS):
+    """Sample index of every zero crossing that starts a swing to the other side"""
+    angle = np.asarray(angle)
+    amplitude = np.percentile(np.abs(angle), AMPLITUDE_PERCENTILE) if len(angle) else 0.0
+    if amplitude == 0:
+        return np.empty(0, dtype=np.int64)
+    threshold = hysteresis * amplitude
+    state = (angle > threshold).astype(np.int8) - (angle < -threshold).astype(np.int8)
+    changes, _ = _hysteresis_changes(state)
+
+    # Place each boundary at the last sign change before the band was left
+    negative = np.signbit(angle)
+    crossings = np.flatnonzero(negative[1:] != negative[:-1]) + 1
+    before = np.searchsorted(crossings, changes, side='right') - 1
+    return np.unique(crossings[before[before >= 0]])
+
+
+def valley_boundaries(force, low=VALLEY_LOW, high=VALLEY_HIGH):
+    """Sample index of the lowest force between consecutive loading excursions"""
+    force = np.asarray(force)
+    if not len(force):
+        return np.empty(0, dtype=np.int64)
+    bottom, top = np.percentile(force, [100 - AMPLITUDE_PERCENTILE, AMPLITUDE_PERCENTILE])
+    span = top - bottom
+    if span == 0:
+        return np.empty(0, dtype=np.int64)
+    state = ((force > bottom + high * span).astype(np.int8) -
+             (force < bottom + low * span).astype(np.int8))
+    changes, sides = _hysteresis_changes(state)
+
+    # Each valley lies between a fall below the low band and the next rise above the high band
+    if len(sides) and sides[0] == 1:
+        changes = changes[1:]
+    falls = changes[0::2]
+    rises = changes[1::2]
+    falls = falls[:len(rises)]
+    if not len(rises):
+        return np.empty(0, dtype=np.int64)
+    # Falls and rises alternate, so together they are contiguous segments
+    # whose even entries are the valleys
+    bounds = np.empty(len(falls) + len(rises), dtype=np.int64)
+    bounds[0::2] = falls
+    bounds[1::2] = rises
+    return SegmentIndex(bounds, 'valleys').argmin(force)[0::2]
+
+
+def build_segment_index(df, method='angle'):
+    """Segment a recording by 'angle' zero crossings or force 'valleys'.
+
+    With method='angle', recordings whose Angle channel gives fewer than
+    MIN_SEGMENTS segments fall back to force valleys.
+    """
+    if method not in ('angle', 'valleys'):
+        raise ValueError(f"Unknown segmentation method: {method}")
+    with smapp_instrumentation.stage('segment_index', items=len(df)):
+        if method == 'angle':
+            bounds = angle_boundaries(df['Angle'].values)
+            if len(bounds) > MIN_SEGMENTS:
+                return SegmentIndex(bounds, 'angle')
+        force = df['Force_filtered'].values if 'Force_filtered' in df else df['Force'].values
+        return SegmentIndex(valley_boundaries(force), 'valleys')
+
+
+def find_cycle_maximums(df, index=None, method='angle'):
+    """Peak of the filtered force in each segment, in the format of find_force_maximums()"""
+    if index is None:
+        index = build_segment_index(df, method)
+    with smapp_instrumentation.stage('cycle_maximums', items=len(df)):
+        peaks = index.argmax(df['Force_filtered'].values)
+    return pd.DataFrame({'Time': df['Time'].values[peaks],
+                         'Force': df['Force_filtered'].values[peaks]})
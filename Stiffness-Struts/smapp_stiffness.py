@@ -0,0 +1,147 @@
+"""Per-cycle stiffness of SMApp recordings from the Force and Angle channels.
+
+Each cycle segment of smapp_segments is split at its force peak into a
+loading part (segment start to peak) and an unloading part. For every
+loading part the stiffness is the least-squares slope of force against
+|angle|; the hysteresis is the area of the force/|angle| loop over the whole
+segment, i.e. the work lost per cycle.
+
+Both are vectorised over all cycles at once. The fit needs only the sums n,
+Σx, Σy, Σxx, Σxy and Σyy of every loading part, taken from cumulative sums
+in blocks of at most CHUNK_SAMPLES samples, so recordings with hundreds of
+thousands of cycles take seconds and bounded memory.
+
+Run this module directly to write the per-cycle table of a recording to
+<recording>_cycles.csv.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import smapp_instrumentation
+from smapp_segments import build_segment_index
+
+ANGLE_UNIT = 'deg'  # Unit of the Angle column, used in the table headers
+CHUNK_SAMPLES = 4000000  # Samples reduced per block; bounds temporary memory
+MIN_FIT_POINTS = 3  # Loading parts with fewer samples get a NaN stiffness
+
+
+def _block_ranges(bounds, chunk_samples):
+    """Split segment boundaries into runs of whole segments of about chunk_samples"""
+    edges = [0]
+    while edges[-1] < len(bounds) - 1:
+        target = bounds[edges[-1]] + chunk_samples
+        stop = int(np.searchsorted(bounds, target, side='right')) - 1
+        edges.append(min(max(stop, edges[-1] + 1), len(bounds) - 1))
+    return zip(edges[:-1], edges[1:])
+
+
+def _range_sums(values, local_bounds):
+    """Sum of values over each [local_bounds[i], local_bounds[i + 1]), empty ranges included"""
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    return np.diff(totals[local_bounds])
+
+
+def segment_sums(bounds, x, y, chunk_samples=CHUNK_SAMPLES):
+    """Return n, Σx, Σy, Σxx, Σxy, Σyy between consecutive (non-decreasing) bounds"""
+    bounds = np.asarray(bounds, dtype=np.int64)
+    sums = np.zeros((6, max(len(bounds) - 1, 0)))
+    for first, last in _block_ranges(bounds, chunk_samples):
+        start, stop = bounds[first], bounds[last]
+        local = bounds[first:last + 1] - start
+        bx = x[start:stop].astype(np.float64)
+        by = y[start:stop].astype(np.float64)
+        sums[0, first:last] = np.diff(local)
+        for row, values in enumerate((bx, by, bx * bx, bx * by, by * by), start=1):
+            sums[row, first:last] = _range_sums(values, local)
+    return sums
+
+
+def loop_areas(index, x, y, chunk_samples=CHUNK_SAMPLES):
+    """Trapezoidal ∮ y dx over every segment (positive for a loop lost as work)"""
+    areas = np.zeros(len(index))
+    for first, last in _block_ranges(index.bounds, chunk_samples):
+        start, stop = index.bounds[first], index.bounds[last]
+        # Step i runs from sample i to i + 1; the last step of a segment
+        # closes it at the first sample of the next one
+        bx = x[start:stop + 1].astype(np.float64)
+        by = y[start:stop + 1].astype(np.float64)
+        steps = np.diff(bx) * (by[1:] + by[:-1]) * 0.5
+        local = np.minimum(index.bounds[first:last + 1] - start, len(steps))
+        areas[first:last] = _range_sums(steps, local)
+    return areas
+
+
+def stiffness_table(df, index=None, method='angle'):
+    """Compact per-cycle table of peak force, stiffness and hysteresis"""
+    if index is None:
+        index = build_segment_index(df, method)
+    with smapp_instrumentation.stage('stiffness', items=len(df)):
+        force = df['Force'].values
+        peak_force = df['Force_filtered'].values if 'Force_filtered' in df else force
+        angle = np.abs(df['Angle'].values)
+
+        peaks = index.argmax(peak_force)
+        # Loading parts (start to peak inclusive) and unloading parts alternate
+        halves = np.empty(2 * len(index) + 1, dtype=np.int64)
+        halves[0::2] = index.bounds if len(index) else 0
+        halves[1::2] = peaks + 1
+        n, sx, sy, sxx, sxy, syy = segment_sums(halves, angle, force)[:, 0::2]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sxx_c = n * sxx - sx * sx
+            syy_c = n * syy - sy * sy
+            sxy_c = n * sxy - sx * sy
+            stiffness = sxy_c / sxx_c
+            r_squared = sxy_c * sxy_c / (sxx_c * syy_c)
+        fitted = n >= MIN_FIT_POINTS
+        stiffness = np.where(fitted, stiffness, np.nan)
+        r_squared = np.where(fitted, r_squared, np.nan)
+
+        return pd.DataFrame({
+            'Cycle': np.arange(1, len(index) + 1, dtype=np.int32),
+            'Start': index.starts,
+            'Peak Time': df['Time'].values[peaks],
+            'Peak Force (N)': peak_force[peaks].astype(np.float32),
+            f'Peak Angle ({ANGLE_UNIT})': angle[peaks].astype(np.float32),
+            f'Stiffness (N/{ANGLE_UNIT})': stiffness.astype(np.float32),
+            'Stiffness R2': r_squared.astype(np.float32),
+            f'Hysteresis (N*{ANGLE_UNIT})': loop_areas(index, angle, force).astype(np.float32),
+        })
+
+
+def stiffness_summary(table):
+    """Console lines summarising a stiffness_table()"""
+    stiffness = table[f'Stiffness (N/{ANGLE_UNIT})'].to_numpy(dtype=np.float64)
+    hysteresis = table[f'Hysteresis (N*{ANGLE_UNIT})'].to_numpy(dtype=np.float64)
+    if not np.any(np.isfinite(stiffness)):
+        return ["\nStiffness: no complete cycles found."]
+    return [
+        "\nStiffness Results:",
+        f"Cycles: {len(table)}",
+        f"Mean Stiffness: {np.nanmean(stiffness):.3f} N/{ANGLE_UNIT} "
+        f"(std {np.nanstd(stiffness):.3f}, min {np.nanmin(stiffness):.3f}, "
+        f"max {np.nanmax(stiffness):.3f})",
+        f"Mean Hysteresis: {np.nanmean(hysteresis):.3f} N*{ANGLE_UNIT} per cycle",
+    ]
+
+
+def save_stiffness_table(table, path):
+    table.to_csv(path, index=False, float_format='%.6g')
+    return path
+
+
+if __name__ == '__main__':
+    from smapp_loader import load_and_process_csv
+    from SMApp_postprocessing import filter_data
+
+    paths = sys.argv[1:] or [input("Enter the full path to the CSV file: ")]
+    for file_path in paths:
+        df = filter_data(load_and_process_csv(file_path))
+        table = stiffness_table(df)
+        for line in stiffness_summary(table):
+            print(line)
+        out_path = save_stiffness_table(table, os.path.splitext(file_path)[0] + '_cycles.csv')
+        print(f"Per-cycle table written to {out_path}")
@@ -0,0 +1,160 @@
+"""Streaming Savitzky-Golay filter and local-maximum detector.
+
+Both classes accept a recording chunk by chunk and keep only the few samples
+of overlap needed at chunk edges, so memory use does not grow with the
+recording length. Their output matches the batch path in SMApp_postprocessing
+(savgol_filter with mode='interp' followed by argrelextrema(np.greater)) to
+floating-point tolerance, which makes them usable both on files too large to
+load and on data that is still being captured.
+"""
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_coeffs, savgol_filter
+
+from smapp_loader import CHUNK_ROWS, iter_force_angle_chunks
+
+EMPTY = np.empty(0)
+EMPTY_INDICES = np.empty(0, dtype=np.int64)
+
+
+class StreamingSavgolFilter:
+    """Chunked equivalent of savgol_filter(x, window_length, polyorder)"""
+    def __init__(self, window_length, polyorder):
+        self.window_length = window_length
+        self.polyorder = polyorder
+        self.half = window_length // 2
+        self.coeffs = savgol_coeffs(window_length, polyorder)
+        self.pending = EMPTY  # Raw samples seen before the first full window
+        self.tail = None  # Last window_length raw samples once started
+
+    def process(self, chunk):
+        """Feed raw samples and return every filtered value that is now final"""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            # Nothing new is final; np.convolve would also swap its operands
+            # once the data is shorter than the kernel
+            return EMPTY
+        if self.tail is None:
+            data = np.concatenate((self.pending, chunk))
+            if len(data) < self.window_length:
+                self.pending = data
+                return EMPTY
+            # Left edge: the polynomial fitted to the first window (mode='interp')
+            left = savgol_filter(data[:self.window_length], self.window_length,
+                                 self.polyorder)[:self.half]
+            self.pending = EMPTY
+        else:
+            data = np.concatenate((self.tail[1:], chunk))
+            left = EMPTY
+        self.tail = data[-self.window_length:].copy()
+        return np.concatenate((left, np.convolve(data, self.coeffs, mode='valid')))
+
+    def finish(self):
+        """Return the filtered values held back for the right edge"""
+        if self.tail is None:
+            if len(self.pending) == 0:
+                return EMPTY
+            # Shorter than one window: defer to the batch filter (and its errors)
+            return savgol_filter(self.pending, self.window_length, self.polyorder)
+        # Right edge: the polynomial fitted to the last window (mode='interp')
+        right = savgol_filter(self.tail, self.window_length, self.polyorder)
+        return right[-self.half:] if self.half else EMPTY
+
+
+class StreamingPeakDetector:
+    """Chunked equivalent of argrelextrema(x, np.greater, order=order).
+
+    A sample is a maximum when it is strictly greater than every sample within
+    `order` positions on both sides. As in argrelextrema's default 'clip'
+    mode, the comparison window is clipped at the ends of the recording, which
+    is reproduced here by padding with copies of the first and last samples.
+    """
+    def __init__(self, order):
+        self.order = order
+        self.context = None  # Last 2 * order values; the newest `order` are undecided
+        self.offset = 0  # Recording index of context[0]
+
+    def process(self, values):
+        """Feed values and return (indices, values) of maxima that are now final"""
+        values = np.asarray(values)
+        if self.context is None:
+            if len(values) == 0:
+                return EMPTY_INDICES, EMPTY
+            self.context = np.full(self.order, values[0], dtype=values.dtype)
+            self.offset = -self.order
+        return self._scan(np.concatenate((self.context, values)))
+
+    def finish(self):
+        """Decide the last `order` samples and return their maxima"""
+        if self.context is None:
+            return EMPTY_INDICES, EMPTY
+        padding = np.full(self.order, self.context[-1], dtype=self.context.dtype)
+        return self._scan(np.concatenate((self.context, padding)))
+
+    def _scan(self, data):
+        order = self.order
+        count = len(data) - 2 * order
+        if count <= 0:
+            self.context = data
+            return EMPTY_INDICES, EMPTY
+        core = data[order:order + count]
+        is_max = np.ones(count, dtype=bool)
+        for shift in range(1, order + 1):
+            is_max &= core > data[order - shift:order - shift + count]
+            is_max &= core > data[order + shift:order + shift + count]
+        positions = np.flatnonzero(is_max) + order
+        indices = positions + self.offset
+
+        self.offset += len(data) - 2 * order
+        self.context = data[-2 * order:].copy()
+        return indices, data[positions]
+
+
+class StreamingForceAnalyzer:
+    """Filter raw force and detect its maxima in one streaming pass"""
+    def __init__(self, window_size=31, poly_order=2, order=50):
+        self.filter = StreamingSavgolFilter(window_size, poly_order)
+        self.detector = StreamingPeakDetector(order)
+
+    def process(self, force):
+        """Return (filtered values, maxima indices, maxima values) now final"""
+        filtered = self.filter.process(force)
+        indices, values = self.detector.process(filtered)
+        return filtered, indices, values
+
+    def finish(self):
+        filtered = self.filter.finish()
+        indices, values = self.detector.process(filtered)
+        last_indices, last_values = self.detector.finish()
+        return (filtered, np.concatenate((indices, last_indices)),
+                np.concatenate((values, last_values)))
+
+
+def stream_force_maximums(file_path, window_size=31, poly_order=2, order=50,
+                          chunk_rows=CHUNK_ROWS, on_filtered=None):
+    """Detect force maximums in a recording without loading it into memory.
+
+    Returns a DataFrame with the same Time/Force columns as
+    find_force_maximums. If given, on_filtered(start, values) receives each
+    block of filtered force as it becomes final.
+    """
+    analyzer = StreamingForceAnalyzer(window_size, poly_order, order)
+    all_indices = []
+    all_values = []
+    emitted = 0
+
+    def collect(result):
+        nonlocal emitted
+        filtered, indices, values = result
+        if on_filtered is not None and len(filtered):
+            on_filtered(emitted, filtered)
+        emitted += len(filtered)
+        all_indices.append(indices)
+        all_values.append(values)
+
+    for chunk in iter_force_angle_chunks(file_path, chunk_rows):
+        collect(analyzer.process(chunk[:, 0]))
+    collect(analyzer.finish())
+
+    return pd.DataFrame({'Time': np.concatenate(all_indices),
+                         'Force': np.concatenate(all_values)})
@@ -0,0 +1,52 @@
+"""Chunked streaming output must equal the batch savgol_filter/argrelextrema path"""
+import numpy as np
+import pytest
+from scipy.signal import argrelextrema, savgol_filter
+
+from smapp_streaming import StreamingForceAnalyzer, StreamingSavgolFilter
+
+
+def make_force(samples=5000, seed=1):
+    rng = np.random.default_rng(seed)
+    t = np.arange(samples)
+    return np.abs(100 * np.sin(t / 80.0)) + rng.normal(0, 2, samples)
+
+
+def split(values, sizes):
+    """Cut values into consecutive chunks of the given sizes (zeros allowed), then the rest"""
+    chunks = []
+    start = 0
+    for size in sizes:
+        chunks.append(values[start:start + size])
+        start += size
+    chunks.append(values[start:])
+    return chunks
+
+
+@pytest.mark.parametrize('sizes', [
+    [100, 0, 100],
+    [0, 0, 10, 0, 25, 0],
+    [1] * 40,
+    [31, 0, 1, 0, 500],
+    [4999],
+])
+def test_filter_matches_batch(sizes):
+    force = make_force()
+    streaming = StreamingSavgolFilter(31, 2)
+    out = [streaming.process(chunk) for chunk in split(force, sizes)]
+    out.append(streaming.finish())
+    filtered = np.concatenate(out)
+    assert len(filtered) == len(force)
+    np.testing.assert_allclose(filtered, savgol_filter(force, 31, 2), atol=1e-9)
+
+
+@pytest.mark.parametrize('sizes', [[100, 0, 100], [7] * 300, [0, 2500, 0]])
+def test_maxima_match_batch(sizes):
+    force = make_force()
+    analyzer = StreamingForceAnalyzer(31, 2, 50)
+    indices = []
+    for chunk in split(force, sizes):
+        indices.append(analyzer.process(chunk)[1])
+    indices.append(analyzer.finish()[1])
+    expected = argrelextrema(savgol_filter(force, 31, 2), np.greater, order=50)[0]
+    np.testing.assert_array_equal(np.concatenate(indices), expected)
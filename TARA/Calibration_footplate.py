@@ -2,6 +2,11 @@ import serial
 import time
 import sys
 
+import numpy as np
+
+from acquisition import SerialLineReader, parse_lines
+from status_display import StatusDisplay
+
 # Configuration
 PORT = 'COM4'  # Replace with your COM port
 BAUD_RATE = 115200
@@ -9,6 +14,7 @@ TIMEOUT = 1  # Timeout in seconds
 MAX_RECONNECT_ATTEMPTS = 20
 RECONNECT_DELAY = 5  # Seconds between reconnection attempts
 CALIBRATION_CYCLES = 20  # Number of cycles to run calibration
+ECHO_READINGS = False  # Debug: print every reading instead of a status line
 
 def connect_serial():
     for attempt in range(MAX_RECONNECT_ATTEMPTS):
@@ -46,55 +52,60 @@ def calibration_phase(ser):
     print("Please start the fatigue testing machine now.")
     print()
     
-    force_readings = []
+    force_readings = np.empty(CALIBRATION_CYCLES, dtype=np.float32)
     cycle_count = 0
+    malformed = 0
+    line_reader = SerialLineReader(ser)
+    
+    def render_progress():
+        if not cycle_count:
+            return f"Waiting for readings (0/{CALIBRATION_CYCLES})..."
+        return (f"Reading {cycle_count}/{CALIBRATION_CYCLES}: "
+                f"Force={force_readings[cycle_count - 1]:.2f}N")
+    
+    display = None if ECHO_READINGS else StatusDisplay(render_progress).start()
     
     try:
         while cycle_count < CALIBRATION_CYCLES:
             try:
-                line = ser.readline().decode('utf-8').strip()
+                # Blocks until data arrives, so no sleep is needed between reads
+                lines = line_reader.read_lines()
                 
-                if line:
-                    # Parse the data: expecting format "cycle,time,force"
-                    data = line.split(',')
-                    if len(data) >= 3:
-                        try:
-                            cycle = int(data[0])
-                            time_ms = float(data[1])
-                            force = float(data[2])
-                            
-                            force_readings.append(force)
-                            cycle_count += 1
-                            
-                            print(f"Cycle {cycle_count}/{CALIBRATION_CYCLES}: "
-                                  f"Cycle={cycle}, Time={time_ms}ms, Force={force:.2f}N")
-                            
-                        except ValueError:
-                            # Skip lines that can't be parsed as numbers
-                            print(f"Skipping invalid data: {line}")
-                            continue
-                    else:
-                        # Skip incomplete data lines
-                        print(f"Skipping incomplete data: {line}")
-                        continue
+                # Parse the whole batch at once; expecting format "cycle,time,force"
+                batch = parse_lines(lines)
+                malformed += batch.malformed
+                taken = min(len(batch), CALIBRATION_CYCLES - cycle_count)
+                force_readings[cycle_count:cycle_count + taken] = batch.force[:taken]
+                cycle_count += taken
+                
+                if ECHO_READINGS:
+                    for i in range(taken):
+                        print(f"Cycle {cycle_count - taken + i + 1}/{CALIBRATION_CYCLES}: "
+                              f"Cycle={batch.cycle[i]}, Time={batch.time_ms[i]}ms, "
+                              f"Force={batch.force[i]:.2f}N")
                 
             except serial.SerialException:
                 print("Lost connection. Attempting to reconnect...")
                 ser.close()
                 ser = connect_serial()
-            
-            # Small delay to prevent excessive CPU usage
-            time.sleep(0.001)
+                line_reader = SerialLineReader(ser)
             
     except KeyboardInterrupt:
+        if display is not None:
+            display.stop()
         print("\nCalibration interrupted by user.")
         return None
+    finally:
+        if display is not None:
+            display.stop()
     
-    return force_readings
+    if malformed:
+        print(f"Skipped {malformed} invalid or incomplete data lines.")
+    return force_readings[:cycle_count]
 
 def calculate_and_display_results(force_readings):
     """Calculate and display calibration results"""
-    if not force_readings:
+    if len(force_readings) == 0:
         print("No valid force readings collected.")
         return
     
@@ -102,15 +113,13 @@ def calculate_and_display_results(force_readings):
     print("CALIBRATION RESULTS")
     print("=" * 50)
     
-    # Calculate statistics
-    avg_force = sum(force_readings) / len(force_readings)
-    min_force = min(force_readings)
-    max_force = max(force_readings)
+    # Calculate statistics over the whole array in float64
+    forces = force_readings.astype(np.float64)
+    avg_force = np.mean(forces)
+    min_force = np.min(forces)
+    max_force = np.max(forces)
     force_range = max_force - min_force
-    
-    # Calculate standard deviation
-    variance = sum((f - avg_force) ** 2 for f in force_readings) / len(force_readings)
-    std_dev = variance ** 0.5
+    std_dev = np.std(forces)
     
     print(f"Total readings collected: {len(force_readings)}")
     print(f"Average force: {avg_force:.3f} N")
@@ -139,7 +148,7 @@ def main():
         force_readings = calibration_phase(ser)
         
         # Phase 3: Results
-        if force_readings:
+        if force_readings is not None:
             calculate_and_display_results(force_readings)
         
     except Exception as e:
@@ -1,8 +1,17 @@
 import serial
 import time
 import os
-import csv
 import sys
+import threading
+import collections
+
+import instrumentation
+from acquisition import SerialLineReader, ReconnectSupervisor, GapRecorder, parse_lines
+from capture_format import CSV_HEADER, RotatingBinaryWriter
+from capture_index import CaptureIndexWriter
+from cycle_stats import CycleStatsTracker
+from live_plot import LivePlot
+from status_display import AcquisitionStatus, StatusDisplay
 
 # Configuration
 PORT = 'COM4'  # Replace with your COM port
@@ -11,17 +20,123 @@ TIMEOUT = 1  # Timeout in seconds
 OUTPUT_FOLDER = r"C:\Users\Administrator\Abilitymade Dropbox\Abilitymade team folder\Product Development & Testing\20241126_TARA\CSV FILES"
 MAX_ROWS = 1000000  # Maximum rows per file
 MAX_RECONNECT_ATTEMPTS = 20
-RECONNECT_DELAY = 5  # Seconds between reconnection attempts
+RECONNECT_DELAY = 5  # Seconds between connection attempts at startup
+INITIAL_RECONNECT_DELAY = 0.5  # First backoff delay after losing the port mid-run
+MAX_RECONNECT_DELAY = 30  # Backoff delay cap; reconnection never gives up mid-run
+USE_THREADED_PIPELINE = True  # Read serial and write CSV on separate threads
+QUEUE_SIZE = 200000  # Lines buffered between the reader and writer threads
+WRITE_BATCH_SIZE = 1000  # Maximum lines written per batch by the writer thread
+CAPTURE_FORMAT = 'csv'  # 'csv' for text parts, 'binary' for compact .tcap parts
+WRITE_CYCLE_SUMMARY = True  # Keep per-cycle peak statistics in <base>_cycle_summary.csv
+WRITE_CAPTURE_INDEX = True  # Index cycle/time ranges of the parts in <base>_index.csv
+LIVE_PLOT = False  # Show a live force plot; needs the threaded pipeline, matplotlib and scipy
+ECHO_LINES = False  # Debug: print every received line (slow on Windows consoles)
+INSTRUMENT = False  # Time the pipeline stages; JSON report in <base>_profile.json at exit or on SIGUSR1/Ctrl+Break
 
 def create_new_file(base_name, part):
     file_name = f"{base_name}_part{part}.csv"
     full_path = os.path.join(OUTPUT_FOLDER, file_name)
     return open(full_path, 'w', newline='')
 
+class RotatingCsvWriter:
+    """CSV writer that starts a new part file every MAX_ROWS rows"""
+    def __init__(self, base_name, index=None):
+        self.base_name = base_name
+        self.index = index
+        self.part = 0
+        self.row_count = 0
+        self.file_size = 0
+        self.malformed = 0
+        self.file = None
+        self.open_next_part()
+
+    def open_next_part(self):
+        if self.file is not None:
+            self.file.close()
+        self.part += 1
+        self.row_count = 0
+        self.file = create_new_file(self.base_name, self.part)
+        header = ','.join(CSV_HEADER) + '\r\n'
+        self.file.write(header)
+        self.file_size = len(header)
+
+    def write_batch(self, batch):
+        self.malformed += batch.malformed
+        lines = batch.lines
+        start = 0
+        while start < len(lines):
+            # Never write past the end of the current part
+            stop = min(len(lines), start + MAX_ROWS - self.row_count)
+            # Lines are already validated numeric fields, so no CSV quoting is needed
+            text = '\r\n'.join(lines[start:stop]) + '\r\n'
+            self.file.write(text)
+            if self.index is not None:
+                # Validated lines are ASCII, so characters are bytes
+                self.index.add_rows(os.path.basename(self.file.name), self.part, self.row_count,
+                                    self.file_size, stop - start, len(text), batch)
+            self.file_size += len(text)
+            self.row_count += stop - start
+            start = stop
+            if self.row_count >= MAX_ROWS:
+                self.open_next_part()
+
+    def close(self):
+        self.file.close()
+        if self.index is not None:
+            self.index.close()
+
+class LineRingBuffer:
+    """Bounded FIFO between the serial reader thread and the CSV writer thread.
+
+    When the writer falls so far behind that the buffer is full, the oldest
+    line is overwritten and counted as dropped.
+    """
+    def __init__(self, maxsize):
+        self.lines = collections.deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def put_many(self, lines):
+        with self.condition:
+            overflow = len(self.lines) + len(lines) - self.lines.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self.lines.extend(lines)
+            self.received += len(lines)
+            if len(self.lines) > self.high_water:
+                self.high_water = len(self.lines)
+            self.condition.notify()
+
+    def get_batch(self, max_items, timeout=0.5):
+        """Wait for lines and return up to max_items of them.
+
+        Returns an empty list on timeout and None once the buffer is closed
+        and fully drained.
+        """
+        with self.condition:
+            if not self.lines and not self.closed:
+                self.condition.wait(timeout)
+            if not self.lines:
+                return None if self.closed else []
+            count = min(max_items, len(self.lines))
+            return [self.lines.popleft() for _ in range(count)]
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+def open_serial():
+    return serial.Serial(PORT, BAUD_RATE, timeout=TIMEOUT)
+
 def connect_serial():
     for attempt in range(MAX_RECONNECT_ATTEMPTS):
         try:
-            ser = serial.Serial(PORT, BAUD_RATE, timeout=TIMEOUT)
+            ser = open_serial()
             print(f"Successfully connected to {PORT}")
             return ser
         except serial.SerialException as e:
@@ -32,52 +147,205 @@ def connect_serial():
     print("Failed to establish connection after multiple attempts. Exiting.")
     sys.exit(1)
 
-def main():
-    base_file_name = input("Enter base file name to save the data (e.g., 'cc3d_A'): ")
-    
-    ser = connect_serial()
-    
-    part = 1
-    row_count = 0
-    current_file = create_new_file(base_file_name, part)
-    csv_writer = csv.writer(current_file)
-    csv_writer.writerow(['Cycle', 'Time (ms)', 'Force(N)'])  # Write header
-    
-    print("Starting data acquisition. Press Ctrl+C to stop.")
+def wait_for_reconnect(ser, gaps, stop_event):
+    """Reopen the port with backoff in the background while the output stays open.
+
+    Returns the new port, or None if stop_event is set first.
+    """
+    print("Lost connection. Reconnecting in the background; output files stay open.")
+    ser.close()
+    gaps.connection_lost()
+    supervisor = ReconnectSupervisor(open_serial, INITIAL_RECONNECT_DELAY, MAX_RECONNECT_DELAY)
+    supervisor.start()
+    try:
+        while not stop_event.is_set():
+            new_ser = supervisor.wait(0.5)
+            if new_ser is not None:
+                gaps.connection_restored()
+                return new_ser
+        return None
+    finally:
+        supervisor.stop()
+
+def read_with_gaps(line_reader, gaps):
+    """Read lines, prefixed with a gap marker if they are the first after a reconnect"""
+    # Includes the blocking wait for data, so this stage is mostly idle time
+    with instrumentation.stage('serial_read') as timer:
+        lines = line_reader.read_lines()
+        timer.items = len(lines)
+    if lines:
+        marker = gaps.marker_line(lines)
+        if marker:
+            lines.insert(0, marker)
+        gaps.note_lines(lines)
+    return lines
+
+def serial_reader(ser, ring_buffer, stop_event):
+    """Reader thread: drain the serial port into the ring buffer"""
+    line_reader = SerialLineReader(ser)
+    gaps = GapRecorder()
+    try:
+        while not stop_event.is_set():
+            try:
+                lines = read_with_gaps(line_reader, gaps)
+                if lines:
+                    ring_buffer.put_many(lines)
+            except serial.SerialException:
+                ser = wait_for_reconnect(ser, gaps, stop_event)
+                if ser is None:
+                    break
+                line_reader = SerialLineReader(ser)
+    finally:
+        if ser is not None:
+            ser.close()
+        marker = gaps.marker_line()  # Stopped while still disconnected
+        if marker:
+            ring_buffer.put_many([marker])
+        ring_buffer.close()
+
+def handle_lines(lines, output, trackers):
+    """Parse, write and track one batch; return the number of records written"""
+    # Parse once per batch; the output and every tracker share the typed columns
+    with instrumentation.stage('parse', items=len(lines)):
+        batch = parse_lines(lines)
+    instrumentation.count('lines', len(lines))
+    instrumentation.count('parse_failures', batch.malformed)
+    with instrumentation.stage('write', items=len(lines)):
+        output.write_batch(batch)
+    for tracker in trackers:
+        with instrumentation.stage(type(tracker).__name__, items=len(batch)):
+            tracker.add_batch(batch)
+    if ECHO_LINES:
+        with instrumentation.stage('echo', items=len(lines)):
+            for line in lines:
+                print(line)
+    return len(batch)
+
+def batch_writer(output, trackers, ring_buffer):
+    """Writer thread: flush lines from the ring buffer to the output in batches"""
+    while True:
+        batch = ring_buffer.get_batch(WRITE_BATCH_SIZE)
+        if batch is None:
+            break
+        if batch:
+            # Malformed lines and gap markers are not records
+            ring_buffer.written += handle_lines(batch, output, trackers)
+
+def run_threaded_acquisition(ser, output, trackers, display=None, live_plot=None):
+    ring_buffer = LineRingBuffer(QUEUE_SIZE)
+    stop_event = threading.Event()
+    reader = threading.Thread(target=serial_reader, args=(ser, ring_buffer, stop_event),
+                              name='serial-reader', daemon=True)
+    writer = threading.Thread(target=batch_writer, args=(output, trackers, ring_buffer),
+                              name='output-writer', daemon=True)
+    reader.start()
+    writer.start()
+
+    try:
+        if live_plot is not None:
+            # The plot runs on the main thread; reading and writing carry on behind it
+            live_plot.run(lambda: reader.is_alive() and writer.is_alive())
+            if reader.is_alive() and writer.is_alive():
+                print("Live plot closed; acquisition continues. Press Ctrl+C to stop.")
+        # The main thread only waits, so Ctrl+C is handled promptly
+        while reader.is_alive() and writer.is_alive():
+            reader.join(0.5)
+    except KeyboardInterrupt:
+        if display is not None:
+            display.stop()
+        print("Interrupted by user.")
+    finally:
+        stop_event.set()
+        reader.join(TIMEOUT + 1)
+        ring_buffer.close()
+        writer.join()
+        print(f"Lines received: {ring_buffer.received}")
+        print(f"Records written: {ring_buffer.written}")
+        print(f"Lines dropped: {ring_buffer.dropped}")
+        print(f"Queue high-water mark: {ring_buffer.high_water}/{QUEUE_SIZE}")
 
+def run_single_thread_acquisition(ser, output, trackers, display=None):
+    line_reader = SerialLineReader(ser)
+    gaps = GapRecorder()
     try:
         while True:
             try:
-                line = ser.readline().decode('utf-8').strip()
+                # Blocks until data arrives, so no sleep is needed between reads
+                lines = read_with_gaps(line_reader, gaps)
                 
-                if line:
-                    csv_writer.writerow(line.split(','))
-                    row_count += 1
-                    print(line)  # Print to console for real-time feedback
-                    
-                    if row_count >= MAX_ROWS:
-                        current_file.close()
-                        part += 1
-                        current_file = create_new_file(base_file_name, part)
-                        csv_writer = csv.writer(current_file)
-                        csv_writer.writerow(['Cycle', 'Time (ms)', 'Force(N)'])  # Write header
-                        row_count = 0
+                if lines:
+                    handle_lines(lines, output, trackers)
                 
             except serial.SerialException:
-                print("Lost connection. Attempting to reconnect...")
-                ser.close()
-                ser = connect_serial()
-            
-            # Add a small delay to prevent excessive CPU usage
-            time.sleep(0.001)
+                ser = wait_for_reconnect(ser, gaps, threading.Event())
+                line_reader = SerialLineReader(ser)
             
     except KeyboardInterrupt:
+        if display is not None:
+            display.stop()
         print("Interrupted by user.")
+    finally:
+        ser.close()
+        marker = gaps.marker_line()  # Stopped while still disconnected
+        if marker:
+            handle_lines([marker], output, trackers)
+
+def main():
+    base_file_name = input("Enter base file name to save the data (e.g., 'cc3d_A'): ")
+    if INSTRUMENT:
+        instrumentation.enable(os.path.join(OUTPUT_FOLDER, f"{base_file_name}_profile.json"))
+    
+    live_plot = None
+    if LIVE_PLOT:
+        if USE_THREADED_PIPELINE:
+            # Created before the port is opened: loading matplotlib takes seconds
+            live_plot = LivePlot()
+        else:
+            print("LIVE_PLOT needs USE_THREADED_PIPELINE; continuing without the live plot.")
+    
+    ser = connect_serial()
+    
+    index = CaptureIndexWriter(OUTPUT_FOLDER, base_file_name) if WRITE_CAPTURE_INDEX else None
+    if CAPTURE_FORMAT == 'binary':
+        output = RotatingBinaryWriter(base_file_name, OUTPUT_FOLDER, index)
+    else:
+        output = RotatingCsvWriter(base_file_name, index)
+    
+    trackers = []
+    cycle_stats = None
+    if WRITE_CYCLE_SUMMARY:
+        summary_path = os.path.join(OUTPUT_FOLDER, f"{base_file_name}_cycle_summary.csv")
+        cycle_stats = CycleStatsTracker(summary_path)
+        trackers.append(cycle_stats)
+    
+    # Real-time feedback on one status line instead of printing every sample
+    status = AcquisitionStatus(output, cycle_stats)
+    trackers.append(status)
+    display = None if ECHO_LINES else StatusDisplay(status.render)
+    
+    if live_plot is not None:
+        trackers.append(live_plot)
+    
+    print("Starting data acquisition. Press Ctrl+C to stop.")
+    if display is not None:
+        display.start()
+
+    try:
+        if USE_THREADED_PIPELINE:
+            run_threaded_acquisition(ser, output, trackers, display, live_plot)
+        else:
+            run_single_thread_acquisition(ser, output, trackers, display)
     except Exception as e:
         print(f"Error: {e}")
     finally:
-        ser.close()
-        current_file.close()
+        if display is not None:
+            display.stop()
+        output.close()
+        for tracker in trackers:
+            tracker.close()
+            tracker.print_summary()
+        if output.malformed:
+            print(f"Malformed lines skipped: {output.malformed}")
         print("Data acquisition complete.")
 
 if __name__ == '__main__':
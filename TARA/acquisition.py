@@ -0,0 +1,275 @@
+"""Shared serial acquisition helpers for the TARA scripts"""
+import math
+import threading
+import time
+
+import numpy as np
+import serial
+
+import instrumentation
+
+MAX_LINE_BUFFER = 1 << 20  # Discard carry-over data that never contains a newline
+GAP_MARKER = '#GAP'  # First field of the gap marker lines written into captures
+GAP_FIELDS = ['Lost at', 'Restored at', 'Last cycle before', 'First cycle after', 'Missed cycles']
+MAX_CYCLE = 2 ** 32 - 1  # Captures store the cycle as an unsigned 32-bit integer
+
+
+class SerialLineReader:
+    """Read complete lines from a serial port in bulk.
+
+    Every call blocks (up to the port timeout) until at least one byte has
+    arrived, then takes everything already waiting in the driver's input
+    buffer with a single read(). Complete lines are split off the front of
+    the buffer in one step; a trailing partial line is carried over to the
+    next call.
+    """
+    def __init__(self, ser):
+        self.ser = ser
+        self.buffer = bytearray()
+        self.bytes_read = 0
+
+    def read_block(self):
+        """Return a bytes block made only of complete lines (b'' if none yet)"""
+        data = self.ser.read(1)  # Efficient blocking wait while the port is idle
+        if not data:
+            return b''
+        waiting = self.ser.in_waiting
+        if waiting:
+            data += self.ser.read(waiting)
+        self.bytes_read += len(data)
+        instrumentation.count('bytes_read', len(data))
+
+        self.buffer += data
+        end = self.buffer.rfind(b'\n')
+        if end < 0:
+            if len(self.buffer) > MAX_LINE_BUFFER:
+                self.buffer.clear()
+            return b''
+        block = bytes(self.buffer[:end + 1])
+        del self.buffer[:end + 1]
+        return block
+
+    def read_lines(self):
+        """Return the complete, non-empty lines received so far as stripped strings"""
+        block = self.read_block()
+        if not block:
+            return []
+        lines = block.decode('utf-8', errors='replace').splitlines()
+        return [line.strip() for line in lines if line and not line.isspace()]
+
+
+class ReconnectSupervisor:
+    """Reopen a lost serial port on a background thread with exponential backoff.
+
+    Unlike connect_serial() it never gives up or exits; it keeps trying until
+    the port opens or stop() is called.
+    """
+    def __init__(self, open_port, initial_delay=0.5, max_delay=30.0):
+        self.open_port = open_port
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.ser = None
+        self.connected = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='serial-reconnect', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        delay = self.initial_delay
+        attempt = 0
+        while not self.stop_event.is_set():
+            attempt += 1
+            try:
+                self.ser = self.open_port()
+                print(f"Reconnected after {attempt} attempt(s).")
+                self.connected.set()
+                return
+            except serial.SerialException as e:
+                print(f"Reconnect attempt {attempt} failed: {e}. Retrying in {delay:.1f} s...")
+            self.stop_event.wait(delay)
+            delay = min(delay * 2, self.max_delay)
+
+    def wait(self, timeout):
+        """Return the reopened port, or None if it is not open yet"""
+        self.connected.wait(timeout)
+        return self.ser
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def parse_cycle(line):
+    try:
+        return int(line.split(',', 1)[0])
+    except ValueError:
+        return None
+
+
+class GapRecorder:
+    """Turn a disconnect into a gap marker line for the capture.
+
+    The marker records when the connection was lost and restored and, from the
+    Cycle column, the last cycle before and the first cycle after the gap:
+
+        #GAP,<lost at>,<restored at>,<last cycle before>,<first cycle after>,<missed cycles>
+    """
+    def __init__(self):
+        self.last_cycle = None
+        self.lost_at = None
+        self.restored_at = None
+        self.cycle_before = None
+        self.gaps = 0
+
+    def note_lines(self, lines):
+        cycle = parse_cycle(lines[-1])
+        if cycle is not None:
+            self.last_cycle = cycle
+
+    def connection_lost(self):
+        if self.lost_at is None:
+            self.lost_at = time.time()
+            self.cycle_before = self.last_cycle
+
+    def connection_restored(self):
+        self.restored_at = time.time()
+
+    def marker_line(self, first_lines=None):
+        """End the current gap and return its marker line (None if not in a gap)"""
+        if self.lost_at is None:
+            return None
+        first_cycle = parse_cycle(first_lines[0]) if first_lines else None
+        missed = ''
+        if first_cycle is not None and self.cycle_before is not None:
+            missed = max(first_cycle - self.cycle_before - 1, 0)
+        restored_at = self.restored_at or time.time()
+        fields = [GAP_MARKER, format_timestamp(self.lost_at), format_timestamp(restored_at),
+                  '' if self.cycle_before is None else self.cycle_before,
+                  '' if first_cycle is None else first_cycle, missed]
+        self.lost_at = None
+        self.restored_at = None
+        self.gaps += 1
+        return ','.join(str(field) for field in fields)
+
+
+class ParsedLines:
+    """A batch of 'cycle,time,force' lines converted to typed columns.
+
+    lines keeps the valid lines and gap markers in their original order, so
+    text outputs can write them unchanged; malformed lines are only counted.
+    """
+    def __init__(self, lines, cycle, time_ms, force, malformed=0, gap_markers=(), gap_rows=()):
+        self.lines = lines
+        self.cycle = cycle
+        self.time_ms = time_ms
+        self.force = force
+        self.malformed = malformed
+        self.gap_markers = list(gap_markers)
+        self.gap_rows = list(gap_rows)  # Valid rows of the batch before each gap marker
+
+    def __len__(self):
+        return len(self.cycle)
+
+
+def parse_lines(lines):
+    """Parse a batch of lines into a ParsedLines (int64 cycle, float64 time, float32 force).
+
+    The whole batch is converted with one NumPy call when every line has
+    exactly three numeric fields, which is the normal case. Batches with gap
+    markers, extra fields or malformed lines fall back to parsing line by
+    line. Both paths use one rule: a line needs at least three fields, and
+    fields after the third are ignored. The cycle must be plain digits no
+    larger than MAX_CYCLE (so '1.0', '1e3' and '-1' are rejected; captures
+    store it unsigned). Time and force must be finite numbers. Other lines
+    count as malformed.
+    """
+    batch = _parse_lines_fast(lines)
+    if batch is None:
+        batch = _parse_lines_slow(lines)
+    return batch
+
+
+def _parse_lines_fast(lines):
+    """Return the parsed batch, or None if any line needs the per-line parser"""
+    count = len(lines)
+    if not count:
+        return _parse_lines_slow(lines)
+    text = '\n'.join(lines)
+    if '#' in text:
+        return None
+    try:
+        raw = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+    # Every line must have exactly two commas, or fields would shift between rows
+    line_ends = np.append(np.flatnonzero(raw == ord('\n')), len(raw))
+    commas = np.flatnonzero(raw == ord(','))
+    commas_before = np.searchsorted(commas, line_ends)
+    if commas_before[0] != 2 or np.any(np.diff(commas_before) != 2):
+        return None
+    # Digits in raw[start:end] are digits[end] - digits[start]
+    is_digit = (raw >= ord('0')) & (raw <= ord('9'))
+    digits = np.append(0, np.cumsum(is_digit))
+    line_starts = np.append(0, line_ends[:-1] + 1)
+    first_commas = commas[0::2]
+    second_commas = commas[1::2]
+    cycle_digits = digits[first_commas] - digits[line_starts]
+    # The cycle field must be non-empty digits only
+    if np.any(cycle_digits == 0) or np.any(cycle_digits != first_commas - line_starts):
+        return None
+    # fromstring reads a blank or whitespace-only field as -1.0, so every
+    # time and force field must contain a digit
+    if (np.any(digits[second_commas] == digits[first_commas + 1])
+            or np.any(digits[line_ends] == digits[second_commas + 1])):
+        return None
+    try:
+        values = np.fromstring(text.replace('\n', ','), dtype=np.float64, sep=',')
+    except ValueError:
+        return None
+    if values.size != 3 * count:
+        return None
+    values = values.reshape(count, 3)
+    if not np.all(np.isfinite(values)) or np.any(values[:, 0] > MAX_CYCLE):
+        return None
+    return ParsedLines(lines, values[:, 0].astype(np.int64), values[:, 1].copy(),
+                       values[:, 2].astype(np.float32))
+
+
+def _parse_lines_slow(lines):
+    kept = []
+    cycles = []
+    times = []
+    forces = []
+    malformed = 0
+    gap_markers = []
+    gap_rows = []
+    for line in lines:
+        if line.startswith(GAP_MARKER):
+            gap_markers.append(line)
+            gap_rows.append(len(cycles))
+            kept.append(line)
+            continue
+        fields = line.split(',')
+        if len(fields) < 3 or not (fields[0].isascii() and fields[0].isdigit()):
+            malformed += 1
+            continue
+        try:
+            cycle, time_ms, force = int(fields[0]), float(fields[1]), float(fields[2])
+        except ValueError:
+            malformed += 1
+            continue
+        if cycle > MAX_CYCLE or not (math.isfinite(time_ms) and math.isfinite(force)):
+            malformed += 1
+            continue
+        kept.append(line)
+        cycles.append(cycle)
+        times.append(time_ms)
+        forces.append(force)
+    return ParsedLines(kept, np.array(cycles, dtype=np.int64), np.array(times, dtype=np.float64),
+                       np.array(forces, dtype=np.float32), malformed, gap_markers, gap_rows)
+
+
+def format_timestamp(seconds):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds)) + f".{int(seconds % 1 * 1000):03d}"
@@ -0,0 +1,190 @@
+"""Throughput benchmark for the TARA acquisition strategies without hardware.
+
+serial.Serial is replaced by a SimulatedSerial stream, so each acquisition
+strategy runs its real loop against a replayed 'cycle,time,force' stream.
+For every strategy the benchmark reports sustained lines/s, end-to-end
+latency percentiles, CPU use and lost lines.
+
+Usage:
+    python bench_acquisition.py [--rate 2000] [--burst 1] [--duration 10]
+                                [--baud 115200] [--disconnect-at 4 --disconnect-for 2]
+                                [--strategies readline,chunked,threaded,calibration]
+                                [--json out.json]
+"""
+import argparse
+import _thread
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import serial
+
+import Calibration_footplate as calibration
+import Python_save_csv_file_v2 as logger
+from acquisition import parse_lines
+from serial_simulator import SimulatedSerial
+
+DRAIN_SECONDS = 1.0  # Time allowed after the stream stops for buffered lines
+
+
+class LatencyProbe:
+    """Tracker that records receive latency of every line it is given"""
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.received = 0
+        self.latencies = []
+
+    def add_batch(self, batch):
+        now_ms = (time.perf_counter() - self.simulator.started_at) * 1000
+        self.latencies.extend((now_ms - batch.time_ms).tolist())
+        self.received += len(batch)
+
+    def close(self):
+        pass
+
+    def print_summary(self):
+        pass
+
+
+def legacy_readline_acquisition(ser, output, trackers):
+    """The original loop: one readline, write and print per line, then a 1 ms sleep"""
+    try:
+        while True:
+            try:
+                line = ser.readline().decode('utf-8').strip()
+                if line:
+                    batch = parse_lines([line])
+                    output.write_batch(batch)
+                    for tracker in trackers:
+                        tracker.add_batch(batch)
+                    print(line)
+            except serial.SerialException:
+                ser.close()
+                ser = logger.connect_serial()
+            time.sleep(0.001)
+    except KeyboardInterrupt:
+        pass
+
+
+def calibration_acquisition(ser, output, trackers):
+    """Calibration_footplate.calibration_phase; it writes no file, so output is unused"""
+    def parse_and_probe(lines):
+        batch = parse_lines(lines)
+        for tracker in trackers:
+            tracker.add_batch(batch)
+        return batch
+
+    calibration.parse_lines = parse_and_probe
+    try:
+        calibration.calibration_phase(ser)  # Returns when interrupted
+    finally:
+        calibration.parse_lines = parse_lines
+
+
+STRATEGIES = {
+    'readline': legacy_readline_acquisition,
+    'chunked': logger.run_single_thread_acquisition,
+    'threaded': logger.run_threaded_acquisition,
+    'calibration': calibration_acquisition,
+}
+
+
+def run_strategy(name, args):
+    with tempfile.TemporaryDirectory(prefix=f"tara_bench_{name}_") as output_folder:
+        return _run_strategy(name, args, output_folder)
+
+
+def _run_strategy(name, args, output_folder):
+    simulator = SimulatedSerial(rate=args.rate, burst=args.burst, baud=args.baud,
+                                input_buffer_size=args.input_buffer,
+                                disconnect_at=args.disconnect_at,
+                                disconnect_for=args.disconnect_for,
+                                timeout=logger.TIMEOUT)
+    probe = LatencyProbe(simulator)
+
+    # Route the logger at the simulator and a scratch folder
+    logger.serial.Serial = simulator.open_port
+    logger.OUTPUT_FOLDER = output_folder
+    logger.RECONNECT_DELAY = 0.1
+    logger.INITIAL_RECONNECT_DELAY = 0.05
+    logger.MAX_RECONNECT_DELAY = 0.2
+    logger.MAX_RECONNECT_ATTEMPTS = int(args.disconnect_for / 0.1) + 20
+    calibration.RECONNECT_DELAY = 0.1
+    calibration.MAX_RECONNECT_ATTEMPTS = logger.MAX_RECONNECT_ATTEMPTS
+    # Enough cycles that calibration only ends when the benchmark stops it
+    calibration.CALIBRATION_CYCLES = int(args.rate * (args.duration + DRAIN_SECONDS) * 2) + 1000
+    output = logger.RotatingCsvWriter('bench')
+
+    def finish():
+        time.sleep(args.duration)
+        simulator.stop()
+        time.sleep(DRAIN_SECONDS)
+        _thread.interrupt_main()
+
+    stopper = threading.Thread(target=finish, daemon=True)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    simulator.start()
+    stopper.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            STRATEGIES[name](simulator.open_port(), output, [probe])
+        except KeyboardInterrupt:
+            pass
+    stopper.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start - simulator.cpu_seconds
+    output.close()
+
+    latencies = np.array(probe.latencies) if probe.latencies else np.zeros(1)
+    return {
+        'strategy': name,
+        'sent': simulator.sent,
+        'received': probe.received,
+        'lost': simulator.sent - probe.received,
+        'lost_overflow': simulator.overflowed,
+        'lost_offline': simulator.missed_offline,
+        'lines_per_s': probe.received / args.duration,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p95_ms': float(np.percentile(latencies, 95)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'latency_max_ms': float(latencies.max()),
+        'cpu_percent': 100 * cpu / wall,
+    }
+
+
+def print_report(results):
+    columns = ['strategy', 'sent', 'received', 'lost', 'lines_per_s',
+               'latency_p50_ms', 'latency_p95_ms', 'latency_p99_ms', 'cpu_percent']
+    print(" ".join(f"{c:>15}" for c in columns))
+    for result in results:
+        print(" ".join(f"{result[c]:>15.1f}" if isinstance(result[c], float) else f"{result[c]:>15}"
+                       for c in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark TARA acquisition strategies.")
+    parser.add_argument('--rate', type=float, default=2000, help="Lines per second sent")
+    parser.add_argument('--burst', type=int, default=1, help="Lines sent together per burst")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds of streaming per strategy")
+    parser.add_argument('--baud', type=int, default=None, help="Cap the stream at this baud rate")
+    parser.add_argument('--input-buffer', type=int, default=1 << 16, help="Driver input buffer bytes")
+    parser.add_argument('--disconnect-at', type=float, default=None, help="Seconds before a disconnect")
+    parser.add_argument('--disconnect-for', type=float, default=0.0, help="Seconds the device is offline")
+    parser.add_argument('--strategies', default=','.join(STRATEGIES), help="Comma-separated strategies")
+    parser.add_argument('--json', default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.strategies.split(','):
+        print(f"Running {name} for {args.duration:.0f} s at {args.rate:.0f} lines/s...")
+        results.append(run_strategy(name, args))
+    print()
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
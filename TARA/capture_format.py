@@ -0,0 +1,180 @@
+"""Compact binary capture files for the TARA logger.
+
+A capture file is a small header followed by fixed-width little-endian
+records, so it can be appended to cheaply while logging and memory-mapped
+directly by NumPy afterwards:
+
+    8 bytes   magic b'TARACAP1'
+    4 bytes   header length N (uint32, little-endian)
+    N bytes   UTF-8 JSON header, space padded so records start 64-byte aligned
+    ...       records of CAPTURE_DTYPE
+
+Each record is 16 bytes instead of the ~25 bytes of a CSV text row. Time is
+a float64, so fractional and negative milliseconds are stored exactly as
+received. Version 1 files stored it as uint32 and remain readable, because
+readers take the record layout from the header. The record count is not
+stored in the header; it follows from the file size, so a file cut short by
+a crash or power loss is still readable.
+
+Run this module directly to convert capture files back to CSV.
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from acquisition import GAP_FIELDS
+
+CAPTURE_MAGIC = b'TARACAP1'
+CAPTURE_EXTENSION = '.tcap'
+CAPTURE_VERSION = 2
+CAPTURE_DTYPE = np.dtype([('cycle', '<u4'), ('force', '<f4'), ('time_ms', '<f8')])  # 8-byte aligned
+CSV_HEADER = ['Cycle', 'Time (ms)', 'Force(N)']
+HEADER_ALIGNMENT = 64
+MAX_CAPTURE_BYTES = 256 * 1024 * 1024  # Start a new part after this many bytes
+MAX_CAPTURE_SECONDS = 24 * 60 * 60  # Start a new part after this much time
+CONVERT_CHUNK_RECORDS = 1000000  # Records converted to CSV per chunk
+
+
+def batch_to_records(batch):
+    """Pack the typed columns of a ParsedLines batch into a record array"""
+    records = np.empty(len(batch), dtype=CAPTURE_DTYPE)
+    records['cycle'] = batch.cycle
+    records['time_ms'] = batch.time_ms
+    records['force'] = batch.force
+    return records
+
+
+def write_capture_header(file, base_name, part):
+    header = {
+        'version': CAPTURE_VERSION,
+        'dtype': CAPTURE_DTYPE.descr,
+        'columns': CSV_HEADER,
+        'base_name': base_name,
+        'part': part,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    text = json.dumps(header).encode('utf-8')
+    prefix_size = len(CAPTURE_MAGIC) + 4
+    padded_size = -(-(prefix_size + len(text)) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+    text += b' ' * (padded_size - prefix_size - len(text))
+    file.write(CAPTURE_MAGIC)
+    file.write(len(text).to_bytes(4, 'little'))
+    file.write(text)
+    return padded_size
+
+
+def read_capture_header(path):
+    """Return (header dict, byte offset of the first record)"""
+    with open(path, 'rb') as file:
+        magic = file.read(len(CAPTURE_MAGIC))
+        if magic != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a TARA capture file")
+        header_size = int.from_bytes(file.read(4), 'little')
+        header = json.loads(file.read(header_size).decode('utf-8'))
+    return header, len(CAPTURE_MAGIC) + 4 + header_size
+
+
+def capture_dtype(header):
+    """Record layout of a capture file, as stored in its header"""
+    return np.dtype([tuple(field) for field in header['dtype']])
+
+
+def open_capture(path):
+    """Memory-map the records of a capture file as a read-only structured array"""
+    header, offset = read_capture_header(path)
+    dtype = capture_dtype(header)
+    count = (os.path.getsize(path) - offset) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+
+def capture_to_csv(capture_path, csv_path=None):
+    """Convert a capture file to CSV in the logger's original format"""
+    if csv_path is None:
+        csv_path = os.path.splitext(capture_path)[0] + '.csv'
+    records = open_capture(capture_path)
+    with open(csv_path, 'w', newline='') as file:
+        file.write(','.join(CSV_HEADER) + '\r\n')
+        for start in range(0, len(records), CONVERT_CHUNK_RECORDS):
+            chunk = records[start:start + CONVERT_CHUNK_RECORDS]
+            columns = np.column_stack([chunk['cycle'], chunk['time_ms'], chunk['force']])
+            np.savetxt(file, columns, fmt=['%d', '%.15g', '%.7g'], delimiter=',', newline='\r\n')
+    return csv_path
+
+
+class RotatingBinaryWriter:
+    """Capture writer that starts a new part by file size or elapsed time.
+
+    Gap markers cannot be stored as fixed-width records, so they go to a
+    <base>_gaps.csv sidecar together with the part and record they precede.
+    """
+    def __init__(self, base_name, folder, index=None):
+        self.base_name = base_name
+        self.folder = folder
+        self.index = index
+        self.part = 0
+        self.row_count = 0
+        self.malformed = 0
+        self.gaps_file = None
+        self.file = None
+        self.file_size = 0
+        self.opened_at = 0.0
+        self.open_next_part()
+
+    def open_next_part(self):
+        if self.file is not None:
+            self.file.close()
+        self.part += 1
+        self.row_count = 0
+        file_name = f"{self.base_name}_part{self.part}{CAPTURE_EXTENSION}"
+        self.file = open(os.path.join(self.folder, file_name), 'wb')
+        self.file_size = write_capture_header(self.file, self.base_name, self.part)
+        self.opened_at = time.monotonic()
+
+    def write_gaps(self, gap_markers, gap_rows):
+        if self.gaps_file is None:
+            gaps_path = os.path.join(self.folder, f"{self.base_name}_gaps.csv")
+            self.gaps_file = open(gaps_path, 'w', newline='')
+            self.gaps_file.write(','.join(['Part', 'Record'] + GAP_FIELDS) + '\r\n')
+        for marker, rows_before in zip(gap_markers, gap_rows):
+            fields = marker.split(',')[1:]
+            record = self.row_count + rows_before
+            self.gaps_file.write(','.join([str(self.part), str(record)] + fields) + '\r\n')
+        self.gaps_file.flush()
+
+    def write_batch(self, batch):
+        self.malformed += batch.malformed
+        if batch.gap_markers:
+            # A batch is never split across parts, so its rows follow row_count
+            self.write_gaps(batch.gap_markers, batch.gap_rows)
+        if len(batch):
+            records = batch_to_records(batch)
+            self.file.write(records.tobytes())
+            if self.index is not None:
+                self.index.add_rows(os.path.basename(self.file.name), self.part, self.row_count,
+                                    self.file_size, len(records), records.nbytes, batch)
+            self.row_count += len(records)
+            self.file_size += records.nbytes
+        if (self.file_size >= MAX_CAPTURE_BYTES or
+                time.monotonic() - self.opened_at >= MAX_CAPTURE_SECONDS):
+            self.open_next_part()
+
+    def close(self):
+        self.file.close()
+        if self.gaps_file is not None:
+            self.gaps_file.close()
+        if self.index is not None:
+            self.index.close()
+
+
+if __name__ == '__main__':
+    paths = sys.argv[1:]
+    if not paths:
+        paths = [input("Enter the full path to the capture file: ")]
+    for capture_path in paths:
+        csv_path = capture_to_csv(capture_path)
+        print(f"Converted {capture_path} -> {csv_path}")
@@ -0,0 +1,172 @@
+"""Index sidecar for multi-part TARA captures, and range reads through it.
+
+While logging, the output writers report every batch they write to a
+CaptureIndexWriter. It groups consecutive rows of one part into blocks of
+about INDEX_BLOCK_ROWS rows and writes one line per block to
+<base>_index.csv:
+
+    File, Part, Row, Offset, Bytes, Rows, Cycle Min, Cycle Max, Time Min, Time Max
+
+Offset and Bytes locate the block inside its part file, so read_range() can
+seek straight to the blocks whose cycle or time range overlaps the request
+and parse only those, whatever the number and size of the parts. The
+ranges are min/max values, so they stay correct if the cycle counter or
+clock restarts during a run.
+
+Run this module directly to export a cycle range to CSV:
+
+    python capture_index.py <folder> <base name> <first cycle> <last cycle>
+"""
+import csv
+import os
+import sys
+
+import numpy as np
+
+from acquisition import parse_lines
+from capture_format import CAPTURE_EXTENSION, CSV_HEADER, capture_dtype, read_capture_header
+
+INDEX_BLOCK_ROWS = 10000  # Rows covered by one index entry (blocks end on batch boundaries)
+RANGE_DTYPE = np.dtype([('cycle', '<i8'), ('time_ms', '<f8'), ('force', '<f4')])
+INDEX_HEADER = ['File', 'Part', 'Row', 'Offset', 'Bytes', 'Rows',
+                'Cycle Min', 'Cycle Max', 'Time Min', 'Time Max']
+
+
+def index_path_for(folder, base_name):
+    return os.path.join(folder, f"{base_name}_index.csv")
+
+
+class CaptureIndexWriter:
+    """Collect written rows into index blocks and append them to the sidecar"""
+    def __init__(self, folder, base_name, block_rows=INDEX_BLOCK_ROWS):
+        self.block_rows = block_rows
+        self.file = open(index_path_for(folder, base_name), 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(INDEX_HEADER)
+        self.block = None
+
+    def add_rows(self, file_name, part, row, offset, rows, nbytes, batch):
+        """Record `rows` rows written at (row, offset) of a part.
+
+        The cycle and time range is taken from the whole batch, which is a
+        superset when the batch was split across two parts.
+        """
+        if self.block is not None and self.block['File'] != file_name:
+            self.end_block()
+        if len(batch):
+            cycles = (int(batch.cycle.min()), int(batch.cycle.max()))
+            times = (float(batch.time_ms.min()), float(batch.time_ms.max()))
+        else:
+            cycles = times = None  # Only gap markers
+        if self.block is None:
+            self.block = {'File': file_name, 'Part': part, 'Row': row, 'Offset': offset,
+                          'Bytes': 0, 'Rows': 0, 'Cycles': cycles, 'Times': times}
+        else:
+            self.block['Cycles'] = _merge(self.block['Cycles'], cycles)
+            self.block['Times'] = _merge(self.block['Times'], times)
+        self.block['Bytes'] += nbytes
+        self.block['Rows'] += rows
+        if self.block['Rows'] >= self.block_rows:
+            self.end_block()
+
+    def end_block(self):
+        block = self.block
+        self.block = None
+        if block is None or block['Cycles'] is None:
+            return
+        self.writer.writerow([block['File'], block['Part'], block['Row'], block['Offset'],
+                              block['Bytes'], block['Rows'], *block['Cycles'], *block['Times']])
+        self.file.flush()  # A crashed run keeps its index up to the last block
+
+    def close(self):
+        self.end_block()
+        self.file.close()
+
+
+def _merge(span, other):
+    if span is None:
+        return other
+    if other is None:
+        return span
+    return (min(span[0], other[0]), max(span[1], other[1]))
+
+
+def load_index(folder, base_name):
+    """Return the index entries as a list of dicts with numeric fields converted"""
+    with open(index_path_for(folder, base_name), newline='') as file:
+        entries = list(csv.DictReader(file))
+    for entry in entries:
+        for key in ('Part', 'Row', 'Offset', 'Bytes', 'Rows', 'Cycle Min', 'Cycle Max'):
+            entry[key] = int(entry[key])
+        entry['Time Min'] = float(entry['Time Min'])
+        entry['Time Max'] = float(entry['Time Max'])
+    return entries
+
+
+def select_blocks(entries, cycles=None, time_ms=None):
+    """Index entries whose cycle and time ranges overlap the requested (first, last) ranges"""
+    return [entry for entry in entries
+            if (cycles is None or
+                (entry['Cycle Max'] >= cycles[0] and entry['Cycle Min'] <= cycles[1])) and
+            (time_ms is None or
+             (entry['Time Max'] >= time_ms[0] and entry['Time Min'] <= time_ms[1]))]
+
+
+def read_block(folder, entry):
+    """Return the rows of one index entry as a RANGE_DTYPE array"""
+    path = os.path.join(folder, entry['File'])
+    if entry['File'].endswith(CAPTURE_EXTENSION):
+        records = np.fromfile(path, dtype=capture_dtype(read_capture_header(path)[0]),
+                              count=entry['Rows'], offset=entry['Offset'])
+        rows = np.empty(len(records), dtype=RANGE_DTYPE)
+        rows['cycle'] = records['cycle']
+        rows['time_ms'] = records['time_ms']
+        rows['force'] = records['force']
+        return rows
+    with open(path, 'rb') as file:
+        file.seek(entry['Offset'])
+        data = file.read(entry['Bytes'])
+    batch = parse_lines(data.decode('ascii', errors='replace').splitlines())
+    rows = np.empty(len(batch), dtype=RANGE_DTYPE)
+    rows['cycle'] = batch.cycle
+    rows['time_ms'] = batch.time_ms
+    rows['force'] = batch.force
+    return rows
+
+
+def iter_range(folder, base_name, cycles=None, time_ms=None, entries=None):
+    """Yield the rows inside the requested ranges, one RANGE_DTYPE array per index block"""
+    if entries is None:
+        entries = load_index(folder, base_name)
+    for entry in select_blocks(entries, cycles, time_ms):
+        rows = read_block(folder, entry)
+        keep = np.ones(len(rows), dtype=bool)
+        if cycles is not None:
+            keep &= (rows['cycle'] >= cycles[0]) & (rows['cycle'] <= cycles[1])
+        if time_ms is not None:
+            keep &= (rows['time_ms'] >= time_ms[0]) & (rows['time_ms'] <= time_ms[1])
+        if keep.any():
+            yield rows[keep]
+
+
+def read_range(folder, base_name, cycles=None, time_ms=None):
+    """Rows of a capture within a cycle and/or time range, e.g. cycles=(400000, 410000)"""
+    blocks = list(iter_range(folder, base_name, cycles, time_ms))
+    if not blocks:
+        return np.empty(0, dtype=RANGE_DTYPE)
+    return np.concatenate(blocks)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 5:
+        print(__doc__)
+        sys.exit(1)
+    folder, base_name = sys.argv[1], sys.argv[2]
+    first, last = int(sys.argv[3]), int(sys.argv[4])
+    rows = read_range(folder, base_name, cycles=(first, last))
+    out_path = os.path.join(folder, f"{base_name}_cycles_{first}-{last}.csv")
+    with open(out_path, 'w', newline='') as file:
+        file.write(','.join(CSV_HEADER) + '\r\n')
+        columns = np.column_stack([rows['cycle'], rows['time_ms'], rows['force']])
+        np.savetxt(file, columns, fmt=['%d', '%.10g', '%.7g'], delimiter=',', newline='\r\n')
+    print(f"Wrote {len(rows)} rows to {out_path}")
@@ -0,0 +1,157 @@
+"""Running per-cycle statistics for the TARA logger.
+
+Everything here is updated in O(1) per sample and keeps constant memory, so
+it can run inside the acquisition loop for the whole length of a test.
+"""
+import collections
+import csv
+
+import numpy as np
+
+DRIFT_WINDOW_CYCLES = 1000  # Cycles used for the rolling drift slope
+SUMMARY_FLUSH_CYCLES = 100  # Flush the summary file every this many cycles
+SUMMARY_HEADER = ['Cycle', 'Samples', 'Peak Force(N)', 'Min Force(N)',
+                  'Mean Peak(N)', 'Std Peak(N)', 'Drift (N/cycle)']
+
+
+class RunningStats:
+    """Welford's single-pass mean and standard deviation, plus min/max"""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def variance(self):
+        # Population variance, matching np.std()
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+
+class RollingSlope:
+    """Least-squares slope of the last `window` (x, y) points.
+
+    Keeps running sums so each update is O(1). x values are stored relative
+    to the first x seen to limit cancellation in the sums.
+    """
+    def __init__(self, window):
+        self.points = collections.deque(maxlen=window)
+        self.x0 = None
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_xy = 0.0
+
+    def add(self, x, y):
+        if self.x0 is None:
+            self.x0 = x
+        x -= self.x0
+        if len(self.points) == self.points.maxlen:
+            old_x, old_y = self.points[0]
+            self.sum_x -= old_x
+            self.sum_y -= old_y
+            self.sum_xx -= old_x * old_x
+            self.sum_xy -= old_x * old_y
+        self.points.append((x, y))
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xx += x * x
+        self.sum_xy += x * y
+
+    @property
+    def slope(self):
+        n = len(self.points)
+        denominator = n * self.sum_xx - self.sum_x * self.sum_x
+        if n < 2 or denominator == 0:
+            return 0.0
+        return (n * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+
+class CycleStatsTracker:
+    """Track the peak force of every cycle and write one summary row per cycle"""
+    def __init__(self, summary_path, drift_window=DRIFT_WINDOW_CYCLES):
+        self.file = open(summary_path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(SUMMARY_HEADER)
+        self.peak_stats = RunningStats()
+        self.drift = RollingSlope(drift_window)
+        self.cycle = None
+        self.cycle_samples = 0
+        self.cycle_max = float('-inf')
+        self.cycle_min = float('inf')
+        self.last_peak = None
+        self.unparsed = 0
+
+    def add_segment(self, cycle, samples, high, low):
+        """Add `samples` consecutive samples of one cycle with the given max/min force"""
+        if cycle != self.cycle:
+            if self.cycle is not None:
+                self.finish_cycle()
+            self.cycle = cycle
+            self.cycle_samples = 0
+            self.cycle_max = float('-inf')
+            self.cycle_min = float('inf')
+        self.cycle_samples += samples
+        if high > self.cycle_max:
+            self.cycle_max = high
+        if low < self.cycle_min:
+            self.cycle_min = low
+
+    def add_sample(self, cycle, force):
+        self.add_segment(cycle, 1, force, force)
+
+    def add_batch(self, batch):
+        self.unparsed += batch.malformed
+        if not len(batch):
+            return
+        # Reduce each run of equal cycle numbers in one NumPy call
+        starts = np.flatnonzero(np.diff(batch.cycle)) + 1
+        starts = np.concatenate(([0], starts))
+        samples = np.diff(np.append(starts, len(batch)))
+        highs = np.maximum.reduceat(batch.force, starts)
+        lows = np.minimum.reduceat(batch.force, starts)
+        for cycle, count, high, low in zip(batch.cycle[starts].tolist(), samples.tolist(),
+                                           highs.tolist(), lows.tolist()):
+            self.add_segment(cycle, count, high, low)
+
+    def finish_cycle(self):
+        self.last_peak = self.cycle_max
+        self.peak_stats.add(self.cycle_max)
+        self.drift.add(self.cycle, self.cycle_max)
+        self.writer.writerow([self.cycle, self.cycle_samples,
+                              f"{self.cycle_max:.3f}", f"{self.cycle_min:.3f}",
+                              f"{self.peak_stats.mean:.3f}", f"{self.peak_stats.std:.3f}",
+                              f"{self.drift.slope:.6f}"])
+        if self.peak_stats.count % SUMMARY_FLUSH_CYCLES == 0:
+            self.file.flush()
+
+    def close(self):
+        # The last cycle may be incomplete, but its peak so far is still recorded
+        if self.cycle is not None:
+            self.finish_cycle()
+            self.cycle = None
+        self.file.close()
+
+    def print_summary(self):
+        print(f"Cycles summarised: {self.peak_stats.count}")
+        if self.peak_stats.count:
+            print(f"Peak force mean: {self.peak_stats.mean:.3f} N "
+                  f"(std {self.peak_stats.std:.3f} N, "
+                  f"min {self.peak_stats.min:.3f} N, max {self.peak_stats.max:.3f} N)")
+            print(f"Drift over last {len(self.drift.points)} cycles: "
+                  f"{self.drift.slope:.6f} N/cycle")
@@ -0,0 +1,197 @@
+"""Lightweight timers and counters for the hot paths of the TARA logger and
+of SMApp post-processing.
+
+Instrumentation is off unless enable() is called. While off, stage()
+returns one shared no-op context manager and count() returns at once, so
+the calls left in the acquisition loop cost well under a microsecond per
+batch.
+
+While on, every stage keeps its call count, total and maximum time, the
+number of items it processed (lines, bytes, samples) and a log2 histogram
+of its latency in microseconds. Counters keep totals. report() turns them
+into rates (items/s, s per million items) and write_report() saves that as
+JSON. enable() writes the report at exit, and on SIGUSR1 (Ctrl+Break on
+Windows) while the run continues. Worker processes send state() back to
+the parent, which merge()s them into one report.
+
+This is the only copy: Stiffness-Struts/smapp_instrumentation.py loads
+this file, so a fix here applies to both folders.
+
+    with instrumentation.stage('write', items=len(lines)):
+        output.write_batch(batch)
+"""
+import atexit
+import json
+import signal
+import threading
+import time
+
+HISTOGRAM_BUCKETS = 24  # Bucket i counts durations below 2**i µs; the last one has the rest
+
+enabled = False
+_stages = {}
+_counters = {}
+_lock = threading.Lock()
+_started = time.monotonic()
+
+
+class _Stage:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.items = 0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds, items):
+        self.calls += 1
+        self.seconds += seconds
+        self.items += items
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        bucket = min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)
+        self.histogram[bucket] += 1
+
+    def merge(self, calls, seconds, max_seconds, items, histogram):
+        self.calls += calls
+        self.seconds += seconds
+        self.items += items
+        if max_seconds > self.max_seconds:
+            self.max_seconds = max_seconds
+        self.histogram = [a + b for a, b in zip(self.histogram, histogram)]
+
+    def state(self):
+        return [self.calls, self.seconds, self.max_seconds, self.items, list(self.histogram)]
+
+
+class _NullTimer:
+    """Shared stand-in for _Timer while instrumentation is off"""
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Timer:
+    __slots__ = ('name', 'items', 'started')
+
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items  # May be set inside the block once the count is known
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.started, self.items)
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+def stage(name, items=0):
+    """Context manager timing one pass through a stage of `items` items"""
+    if not enabled:
+        return NULL_TIMER
+    return _Timer(name, items)
+
+
+def _stage_entry(name):
+    entry = _stages.get(name)
+    if entry is None:
+        entry = _stages[name] = _Stage()
+    return entry
+
+
+def record(name, seconds, items=0):
+    if not enabled:
+        return
+    with _lock:
+        _stage_entry(name).add(seconds, items)
+
+
+def count(name, amount=1):
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def state():
+    """Raw stages and counters, picklable, for merge() in another process"""
+    with _lock:
+        return {name: entry.state() for name, entry in _stages.items()}, dict(_counters)
+
+
+def merge(other):
+    """Add the state() of another process to this one"""
+    stages, counters = other
+    with _lock:
+        for name, entry_state in stages.items():
+            _stage_entry(name).merge(*entry_state)
+        for name, amount in counters.items():
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+def reset():
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _started = time.monotonic()
+
+
+def report():
+    """Return all stages and counters as a JSON-serialisable dict"""
+    with _lock:
+        elapsed = time.monotonic() - _started
+        stages = {}
+        for name, entry in _stages.items():
+            stages[name] = {
+                'calls': entry.calls,
+                'total_s': round(entry.seconds, 6),
+                'mean_ms': round(entry.seconds / entry.calls * 1000, 4),
+                'max_ms': round(entry.max_seconds * 1000, 4),
+                'items': entry.items,
+                'items_per_s': (round(entry.items / entry.seconds, 1)
+                                if entry.items and entry.seconds else None),
+                's_per_million_items': (round(entry.seconds / entry.items * 1e6, 4)
+                                        if entry.items else None),
+                'share_of_elapsed': round(entry.seconds / elapsed, 4) if elapsed else None,
+                'histogram_us': {f"<{2 ** i}" if i < HISTOGRAM_BUCKETS - 1 else "rest": n
+                                 for i, n in enumerate(entry.histogram) if n},
+            }
+        counters = {name: {'total': total, 'per_s': round(total / elapsed, 1) if elapsed else None}
+                    for name, total in _counters.items()}
+    return {'elapsed_s': round(elapsed, 3), 'stages': stages, 'counters': counters}
+
+
+def write_report(path):
+    with open(path, 'w') as file:
+        json.dump(report(), file, indent=2)
+    print(f"Instrumentation report written to {path}")
+
+
+def enable(report_path=None):
+    """Start collecting. With a report_path, also write the report at exit
+    and when the report signal arrives.
+
+    Must be called from the main thread, which is where signal handlers live.
+    """
+    global enabled
+    enabled = True
+    reset()
+    if report_path is None:
+        return
+    atexit.register(write_report, report_path)
+    report_signal = getattr(signal, 'SIGUSR1', None) or getattr(signal, 'SIGBREAK', None)
+    if report_signal is not None:
+        # The signal can arrive while the main thread holds _lock in record() or
+        # count(); writing from another thread waits for it instead of deadlocking
+        signal.signal(report_signal, lambda signum, frame: threading.Thread(
+            target=write_report, args=(report_path,), name='instrumentation-report').start())
@@ -0,0 +1,195 @@
+"""Optional live force plot for the TARA logger.
+
+LivePlot is a logger tracker: the writer thread copies each batch into
+fixed-size NumPy ring buffers (recent samples and recent cycle peaks), so
+memory stays constant however long the run is. The plot itself runs on the
+main thread, while the reader and writer threads keep acquiring. It redraws
+at most LIVE_PLOT_FPS times a second and uses blitting: the axes, ticks and
+labels are only redrawn when the axis limits change, while the three lines
+(raw force, Savitzky-Golay smoothed force and cycle peaks) are drawn on top
+of a saved background. The lines are min/max decimated to LIVE_PLOT_POINTS
+points first: drawing holds the GIL, and short draws keep the reader thread
+from being starved long enough for the serial input buffer to overflow.
+
+matplotlib and scipy are imported when a LivePlot is created, before
+acquisition starts, so loading them never competes with the reader.
+"""
+import threading
+import time
+
+import numpy as np
+
+import instrumentation
+
+LIVE_PLOT_SAMPLES = 5000  # Most recent samples kept and shown (~8 s at 115200 baud)
+LIVE_PLOT_PEAKS = 200  # Most recent cycle peaks kept and shown
+LIVE_PLOT_FPS = 10  # Maximum redraws per second
+SMOOTH_WINDOW = 31  # Savitzky-Golay window, as in SMApp's filter_data
+SMOOTH_POLY_ORDER = 2
+LIVE_PLOT_POINTS = 1000  # Points drawn per line; more samples are min/max decimated
+Y_MARGIN = 0.1  # Fraction of the force range added above and below
+
+
+class ForceRingBuffer:
+    """Fixed-size ring of (time_ms, force) pairs; extend() overwrites the oldest"""
+    def __init__(self, size):
+        self.time_ms = np.zeros(size)
+        self.force = np.zeros(size, dtype=np.float32)
+        self.size = size
+        self.count = 0  # Total pairs ever added
+        self.lock = threading.Lock()
+
+    def extend(self, time_ms, force):
+        time_ms = time_ms[-self.size:]
+        force = force[-self.size:]
+        with self.lock:
+            start = self.count % self.size
+            first = min(len(force), self.size - start)
+            self.time_ms[start:start + first] = time_ms[:first]
+            self.force[start:start + first] = force[:first]
+            self.time_ms[:len(force) - first] = time_ms[first:]
+            self.force[:len(force) - first] = force[first:]
+            self.count += len(force)
+
+    def snapshot(self):
+        """Copies of the stored pairs, oldest first"""
+        with self.lock:
+            if self.count <= self.size:
+                return self.time_ms[:self.count].copy(), self.force[:self.count].copy()
+            start = self.count % self.size
+            return (np.roll(self.time_ms, -start), np.roll(self.force, -start))
+
+
+def decimate_min_max(x, y, points=LIVE_PLOT_POINTS):
+    """Keep the min and max of y in each of points // 2 bins, so peaks survive"""
+    bins = points // 2
+    if len(y) <= points or bins < 1:
+        return x, y
+    per_bin = len(y) // bins
+    start = len(y) - per_bin * bins  # Drop the oldest remainder so the latest sample stays
+    binned = y[start:].reshape(bins, per_bin)
+    lows = binned.argmin(axis=1)
+    highs = binned.argmax(axis=1)
+    offsets = np.arange(bins) * per_bin + start
+    keep = np.column_stack([np.minimum(lows, highs), np.maximum(lows, highs)])
+    keep = (keep + offsets[:, None]).ravel()
+    return x[keep], y[keep]
+
+
+class LivePlot:
+    """Logger tracker that feeds the ring buffers, plus the main-thread plot loop"""
+    def __init__(self, samples=LIVE_PLOT_SAMPLES, peaks=LIVE_PLOT_PEAKS):
+        import matplotlib.pyplot as plt
+        from scipy.signal import savgol_filter
+        self.plt = plt
+        self.savgol_filter = savgol_filter
+        self.samples = ForceRingBuffer(samples)
+        self.peaks = ForceRingBuffer(peaks)
+        self.cycle = None
+        self.peak_force = float('-inf')
+        self.peak_time = 0.0
+
+    def add_batch(self, batch):
+        if not len(batch):
+            return
+        self.samples.extend(batch.time_ms, batch.force)
+        # Track the peak of the running cycle; a batch holds only a few cycles
+        bounds = np.flatnonzero(np.diff(batch.cycle)) + 1
+        for start, stop in zip(np.concatenate(([0], bounds)), np.append(bounds, len(batch))):
+            cycle = int(batch.cycle[start])
+            if cycle != self.cycle:
+                self.finish_cycle()
+                self.cycle = cycle
+            top = start + int(np.argmax(batch.force[start:stop]))
+            if batch.force[top] > self.peak_force:
+                self.peak_force = float(batch.force[top])
+                self.peak_time = float(batch.time_ms[top])
+
+    def finish_cycle(self):
+        if self.cycle is not None:
+            self.peaks.extend(np.array([self.peak_time]), np.array([self.peak_force]))
+        self.peak_force = float('-inf')
+
+    def close(self):
+        pass
+
+    def print_summary(self):
+        pass
+
+    def run(self, keep_running, fps=LIVE_PLOT_FPS):
+        """Show the plot until the window is closed or keep_running() returns False"""
+        plt = self.plt
+        savgol_filter = self.savgol_filter
+        fig, ax = plt.subplots(figsize=(12, 5))
+        # The raw trace is dense, and antialiasing it costs more than it shows
+        raw_line, = ax.plot([], [], color='lightgreen', label='Raw Force',
+                            antialiased=False, animated=True)
+        smooth_line, = ax.plot([], [], color='green', label='Filtered Force', animated=True)
+        peak_line, = ax.plot([], [], 'o', color='red', label='Cycle Peaks', animated=True)
+        title = ax.set_title('Waiting for data...', animated=True)
+        artists = (raw_line, smooth_line, peak_line, title)
+        ax.set_xlabel('Time before latest sample (s)')
+        ax.set_ylabel('Force (N)')
+        ax.grid(True)
+        ax.legend(loc='upper left')
+
+        closed = threading.Event()
+        fig.canvas.mpl_connect('close_event', lambda event: closed.set())
+        background = [None]
+
+        def save_background(event=None):
+            background[0] = fig.canvas.copy_from_bbox(fig.bbox)
+        # Any full redraw (resize, new limits) refreshes the saved background
+        fig.canvas.mpl_connect('draw_event', save_background)
+        plt.show(block=False)
+        fig.canvas.draw()
+
+        interval = 1.0 / fps
+        while keep_running() and not closed.is_set():
+            frame_started = time.monotonic()
+            time_ms, force = self.samples.snapshot()
+            if len(force):
+                latest = time_ms[-1]
+                x = (time_ms - latest) / 1000
+                raw_line.set_data(*decimate_min_max(x, force))
+                if len(force) >= SMOOTH_WINDOW:
+                    smooth = savgol_filter(force, SMOOTH_WINDOW, SMOOTH_POLY_ORDER)
+                    smooth_line.set_data(*decimate_min_max(x, smooth))
+                peak_time, peak_force = self.peaks.snapshot()
+                keep = peak_time >= time_ms[0]
+                peak_line.set_data((peak_time[keep] - latest) / 1000, peak_force[keep])
+                last_peak = f", last peak {peak_force[-1]:.2f} N" if len(peak_force) else ""
+                title.set_text(f"Cycle {self.cycle}: {force[-1]:.2f} N{last_peak}")
+                if self.update_limits(ax, x, force):
+                    fig.canvas.draw()  # New limits: redraw axes and save a new background
+
+            fig.canvas.restore_region(background[0])
+            for artist in artists:
+                ax.draw_artist(artist)
+            fig.canvas.blit(fig.bbox)
+            fig.canvas.flush_events()
+            instrumentation.record('live_plot_frame', time.monotonic() - frame_started)
+            time.sleep(max(0.0, frame_started + interval - time.monotonic()))
+        plt.close(fig)
+
+    @staticmethod
+    def update_limits(ax, x, force):
+        """Widen or shrink the axis limits when the data no longer fits well.
+
+        Returns True if they changed. Limits change rarely, so most frames
+        are pure blits.
+        """
+        changed = False
+        span = min(x[0], -1e-3)
+        left, _ = ax.get_xlim()
+        if span < left or span > left * 0.25:
+            # Leave room to grow while the ring buffer is still filling
+            ax.set_xlim(span * 2, 0)
+            changed = True
+        low, high = float(force.min()), float(force.max())
+        margin = max((high - low) * Y_MARGIN, 1.0)
+        bottom, top = ax.get_ylim()
+        if low < bottom or high > top or (top - bottom) > 3 * (high - low + 2 * margin):
+            ax.set_ylim(low - margin, high + margin)
+            changed = True
+        return changed
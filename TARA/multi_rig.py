@@ -0,0 +1,287 @@
+"""Acquire several TARA test rigs from one process with asyncio.
+
+Each rig (serial port + base file name) gets its own reader task, writer
+task and rotating output, configured the same way as the single-rig logger
+in Python_save_csv_file_v2.py. Blocking serial reads and disk writes run on
+small per-rig thread pools and are awaited from the event loop, so a rig
+that stalls, disconnects or is being reconnected never holds up the others.
+Idle rigs block in the driver rather than polling, which keeps CPU use low.
+On Ctrl+C every reader finishes its read in flight and stops, the writers
+drain their queues, and only then are the outputs closed, so no line that
+was read is lost.
+
+Reconnection follows the single-rig logger. At startup a rig gets up to
+MAX_RECONNECT_ATTEMPTS attempts RECONNECT_DELAY seconds apart, and a rig that
+cannot be reached is stopped on its own instead of exiting. A rig lost
+mid-run is reopened with exponential backoff (INITIAL_RECONNECT_DELAY up to
+MAX_RECONNECT_DELAY) and never given up on, and a #GAP marker line from
+GapRecorder goes into its capture ahead of the first lines after the gap.
+The waiting is done with asyncio, so other rigs carry on meanwhile.
+
+Usage:
+    python multi_rig.py COM4=cc3d_A COM5=cc3d_B
+"""
+import asyncio
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serial
+
+import instrumentation
+import Python_save_csv_file_v2 as logger
+from acquisition import GapRecorder, SerialLineReader, parse_lines
+from capture_format import RotatingBinaryWriter
+from capture_index import CaptureIndexWriter
+from cycle_stats import CycleStatsTracker
+
+RIGS = [('COM4', 'cc3d_A')]  # (port, base file name) used when none are given
+RIG_QUEUE_SIZE = 1000  # Read batches buffered per rig before lines are dropped
+RIG_READ_INTERVAL = 0.02  # Seconds of data gathered per read round trip
+STATUS_INTERVAL = 10  # Seconds between status lines
+
+
+class Rig:
+    def __init__(self, port, base_name):
+        self.port = port
+        self.base_name = base_name
+        self.ser = None
+        self.line_reader = None
+        self.gaps = GapRecorder()
+        self.queue = asyncio.Queue(RIG_QUEUE_SIZE)
+        # One thread each, so reads and writes of a rig stay in order
+        self.read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{port}-read")
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{port}-write")
+        self.received = 0
+        self.written = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.state = 'starting'
+        self.stopping = asyncio.Event()
+
+        index = None
+        if logger.WRITE_CAPTURE_INDEX:
+            index = CaptureIndexWriter(logger.OUTPUT_FOLDER, base_name)
+        if logger.CAPTURE_FORMAT == 'binary':
+            self.output = RotatingBinaryWriter(base_name, logger.OUTPUT_FOLDER, index)
+        else:
+            self.output = logger.RotatingCsvWriter(base_name, index)
+        self.trackers = []
+        if logger.WRITE_CYCLE_SUMMARY:
+            summary_path = os.path.join(logger.OUTPUT_FOLDER, f"{base_name}_cycle_summary.csv")
+            self.trackers.append(CycleStatsTracker(summary_path))
+
+    async def run_in(self, executor, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+    async def pause(self, seconds):
+        """Sleep, but wake up early when the rig is being stopped"""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def open_port(self):
+        open_port = functools.partial(serial.Serial, self.port, logger.BAUD_RATE,
+                                      timeout=logger.TIMEOUT)
+        self.ser = await self.run_in(self.read_executor, open_port)
+        self.line_reader = SerialLineReader(self.ser)
+        self.state = 'connected'
+
+    async def connect(self):
+        """Async version of connect_serial(); returns False instead of exiting"""
+        for attempt in range(logger.MAX_RECONNECT_ATTEMPTS):
+            try:
+                await self.open_port()
+                print(f"[{self.port}] Successfully connected")
+                return True
+            except serial.SerialException as e:
+                self.state = 'reconnecting'
+                print(f"[{self.port}] Attempt {attempt + 1}/{logger.MAX_RECONNECT_ATTEMPTS}: "
+                      f"Failed to connect. Error: {e}")
+                if attempt < logger.MAX_RECONNECT_ATTEMPTS - 1 and not self.stopping.is_set():
+                    await self.pause(logger.RECONNECT_DELAY)
+        print(f"[{self.port}] Failed to establish connection after multiple attempts. "
+              f"Stopping this rig.")
+        self.state = 'failed'
+        return False
+
+    async def reconnect(self):
+        """Async version of wait_for_reconnect(): retry with backoff until reopened.
+
+        Returns False only if the rig is stopped first.
+        """
+        print(f"[{self.port}] Lost connection. Reconnecting in the background; "
+              f"output files stay open.")
+        self.ser.close()
+        self.gaps.connection_lost()
+        self.state = 'reconnecting'
+        self.reconnects += 1
+        delay = logger.INITIAL_RECONNECT_DELAY
+        attempt = 0
+        while not self.stopping.is_set():
+            attempt += 1
+            try:
+                await self.open_port()
+                self.gaps.connection_restored()
+                print(f"[{self.port}] Reconnected after {attempt} attempt(s).")
+                return True
+            except serial.SerialException as e:
+                print(f"[{self.port}] Reconnect attempt {attempt} failed: {e}. "
+                      f"Retrying in {delay:.1f} s...")
+            await self.pause(delay)
+            delay = min(delay * 2, logger.MAX_RECONNECT_DELAY)
+        return False
+
+    def read_batch(self):
+        """Wait for data on the read thread, then gather RIG_READ_INTERVAL of it.
+
+        Batching wakes the event loop ~50 times a second instead of once per
+        driver read.
+        """
+        started = time.monotonic()
+        lines = self.line_reader.read_lines()
+        if lines:
+            time.sleep(max(0.0, started + RIG_READ_INTERVAL - time.monotonic()))
+            try:
+                if self.ser.in_waiting:
+                    lines += self.line_reader.read_lines()
+            except serial.SerialException:
+                pass  # Keep the lines already read; the next read reports the loss
+        return lines
+
+    async def read_loop(self):
+        try:
+            if not await self.connect():
+                return
+            while not self.stopping.is_set():
+                try:
+                    lines = await self.run_in(self.read_executor, self.read_batch)
+                except serial.SerialException:
+                    if not await self.reconnect():
+                        return
+                    continue
+                if lines:
+                    self.received += len(lines)
+                    marker = self.gaps.marker_line(lines)
+                    if marker:
+                        lines.insert(0, marker)
+                    self.gaps.note_lines(lines)
+                    self.queue_lines(lines)
+        finally:
+            marker = self.gaps.marker_line()  # Stopped while still disconnected
+            if marker:
+                self.queue_lines([marker])
+            await self.queue.put(None)  # Tell the writer to finish
+
+    def queue_lines(self, lines):
+        try:
+            self.queue.put_nowait(lines)
+        except asyncio.QueueFull:
+            self.dropped += len(lines)
+
+    def write_lines(self, lines):
+        # Stages are shared by all rigs, so the report shows the combined load
+        with instrumentation.stage('parse', items=len(lines)):
+            batch = parse_lines(lines)
+        instrumentation.count('lines', len(lines))
+        instrumentation.count('parse_failures', batch.malformed)
+        with instrumentation.stage('write', items=len(lines)):
+            self.output.write_batch(batch)
+        for tracker in self.trackers:
+            with instrumentation.stage(type(tracker).__name__, items=len(batch)):
+                tracker.add_batch(batch)
+        return len(batch)
+
+    async def write_loop(self):
+        finished = False
+        while not finished:
+            lines = await self.queue.get()
+            if lines is None:
+                break
+            # Merge whatever else is already waiting into one write
+            while not self.queue.empty():
+                more = self.queue.get_nowait()
+                if more is None:
+                    finished = True
+                    break
+                lines += more
+            # Malformed lines and gap markers are not records
+            self.written += await self.run_in(self.write_executor, self.write_lines, lines)
+
+    def close(self):
+        """Close the rig once its reader and writer tasks have finished"""
+        self.write_executor.shutdown(wait=True)  # No write may still be using the files
+        self.output.close()
+        for tracker in self.trackers:
+            tracker.close()
+        if self.ser is not None:
+            self.ser.close()
+        self.read_executor.shutdown(wait=False)
+
+    def status(self):
+        return (f"[{self.port}] {self.state}: {self.received} received, {self.written} written, "
+                f"{self.dropped} dropped, part {self.output.part}, {self.reconnects} reconnects")
+
+
+async def report_status(rigs):
+    while True:
+        await asyncio.sleep(STATUS_INTERVAL)
+        for rig in rigs:
+            print(rig.status())
+
+
+async def run_rigs(rig_configs):
+    rigs = [Rig(port, base_name) for port, base_name in rig_configs]
+    readers = [asyncio.create_task(rig.read_loop()) for rig in rigs]
+    writers = [asyncio.create_task(rig.write_loop()) for rig in rigs]
+    status_task = asyncio.create_task(report_status(rigs))
+    started = time.monotonic()
+    try:
+        # Unlike gather, wait does not cancel the tasks when Ctrl+C cancels this one
+        await asyncio.wait(readers + writers, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        status_task.cancel()
+        for rig, reader, writer in zip(rigs, readers, writers):
+            rig.stopping.set()
+            if writer.done():
+                reader.cancel()  # Its writer failed; nothing would take the lines
+        # Readers finish the read in flight and queue their last lines; writers drain them
+        await asyncio.wait(readers + writers)
+        elapsed = time.monotonic() - started
+        for rig in rigs:
+            rig.close()
+            print(rig.status())
+        print(f"Acquisition ran for {elapsed:.0f} s.")
+    for task in readers + writers:
+        if not task.cancelled():
+            task.result()  # Raise the first error, as gather did
+
+
+def parse_rig_arguments(arguments):
+    rigs = []
+    for argument in arguments:
+        port, _, base_name = argument.partition('=')
+        if not base_name:
+            base_name = input(f"Enter base file name for {port} (e.g., 'cc3d_A'): ")
+        rigs.append((port, base_name))
+    return rigs
+
+
+def main():
+    rig_configs = parse_rig_arguments(sys.argv[1:]) or RIGS
+    if logger.INSTRUMENT:
+        instrumentation.enable(os.path.join(logger.OUTPUT_FOLDER, 'multi_rig_profile.json'))
+    print(f"Starting data acquisition on {', '.join(port for port, _ in rig_configs)}. "
+          f"Press Ctrl+C to stop.")
+    try:
+        asyncio.run(run_rigs(rig_configs))
+    except KeyboardInterrupt:
+        print("Interrupted by user.")
+    print("Data acquisition complete.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""In-process stand-in for serial.Serial that replays a footplate data stream.
+
+SimulatedSerial implements the parts of the pyserial API the TARA scripts
+use (read, readline, in_waiting, close) on top of a background thread that
+generates 'cycle,time,force' lines at a configurable rate. It can send in
+bursts, throttle to a baud rate, overflow a bounded driver input buffer like
+a real port does, and drop off the bus for a while to exercise reconnection.
+
+The time field is the send time in milliseconds since the stream started, so
+a consumer can compute end-to-end latency from the line alone.
+"""
+import math
+import threading
+import time
+
+import serial
+
+SAMPLES_PER_CYCLE = 100
+PEAK_FORCE = 800.0  # Newtons
+
+
+class SimulatedSerial:
+    def __init__(self, rate=1000, burst=1, baud=None, input_buffer_size=1 << 16,
+                 disconnect_at=None, disconnect_for=0.0, timeout=1):
+        self.rate = rate  # Lines per second
+        self.burst = burst  # Lines sent together in each burst
+        self.baud = baud  # Caps bytes/s at baud / 10 when set
+        self.input_buffer_size = input_buffer_size
+        self.disconnect_at = disconnect_at  # Seconds after start, or None
+        self.disconnect_for = disconnect_for
+        self.timeout = timeout
+
+        self.buffer = bytearray()
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started_at = None
+        self.is_open = True
+        self.sent = 0  # Lines the device produced
+        self.overflowed = 0  # Lines lost to a full input buffer
+        self.missed_offline = 0  # Lines produced while disconnected
+        self.cpu_seconds = 0.0  # CPU used by the generator thread itself
+
+    # Stream generation
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.thread = threading.Thread(target=self._generate, name='serial-simulator', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def is_offline(self, now=None):
+        if self.disconnect_at is None or self.started_at is None:
+            return False
+        elapsed = (now or time.perf_counter()) - self.started_at
+        return self.disconnect_at <= elapsed < self.disconnect_at + self.disconnect_for
+
+    def make_line(self, seq, elapsed):
+        cycle = seq // SAMPLES_PER_CYCLE
+        phase = (seq % SAMPLES_PER_CYCLE) / SAMPLES_PER_CYCLE
+        force = PEAK_FORCE * math.sin(math.pi * phase) ** 2
+        return f"{cycle},{elapsed * 1000:.3f},{force:.2f}\r\n".encode()
+
+    def _generate(self):
+        cpu_start = time.thread_time()
+        interval = self.burst / self.rate
+        bursts_sent = 0
+        bytes_budget = 0.0
+        last = self.started_at
+        while not self.stop_event.is_set():
+            time.sleep(min(interval, 0.001))
+            now = time.perf_counter()
+            due = int((now - self.started_at) / interval) - bursts_sent
+            if due <= 0:
+                continue
+            bursts_sent += due
+            if self.baud:
+                bytes_budget = min(bytes_budget + (now - last) * self.baud / 10, self.baud / 10)
+                last = now
+
+            data = bytearray()
+            count = 0
+            for _ in range(due * self.burst):
+                line = self.make_line(self.sent + count, now - self.started_at)
+                if self.baud:
+                    if bytes_budget < len(line):
+                        break  # The wire is saturated; the device falls behind
+                    bytes_budget -= len(line)
+                data += line
+                count += 1
+            self.sent += count
+
+            if self.is_offline(now):
+                self.missed_offline += count
+                continue
+            with self.condition:
+                if len(self.buffer) + len(data) > self.input_buffer_size:
+                    self.overflowed += count
+                else:
+                    self.buffer += data
+                    self.condition.notify_all()
+        self.cpu_seconds = time.thread_time() - cpu_start
+
+    # pyserial API
+
+    def open_port(self, *args, **kwargs):
+        """Factory to patch in for serial.Serial; fails while the device is offline"""
+        if self.is_offline():
+            raise serial.SerialException("simulated device is disconnected")
+        self.is_open = True
+        return self
+
+    @property
+    def in_waiting(self):
+        self._check_online()
+        return len(self.buffer)
+
+    def _check_online(self):
+        if self.is_offline():
+            self.is_open = False
+        if not self.is_open:
+            with self.condition:
+                self.buffer.clear()
+            raise serial.SerialException("simulated device disconnected")
+
+    def read(self, size=1):
+        self._check_online()
+        deadline = time.perf_counter() + (self.timeout or 0)
+        with self.condition:
+            while not self.buffer:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return b''
+                self.condition.wait(min(remaining, 0.05))
+                if self.is_offline():
+                    break
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+        self._check_online()
+        return data
+
+    def readline(self):
+        self._check_online()
+        deadline = time.perf_counter() + (self.timeout or 0)
+        with self.condition:
+            while b'\n' not in self.buffer:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    data = bytes(self.buffer)
+                    self.buffer.clear()
+                    return data
+                self.condition.wait(min(remaining, 0.05))
+            end = self.buffer.index(b'\n') + 1
+            data = bytes(self.buffer[:end])
+            del self.buffer[:end]
+        return data
+
+    def close(self):
+        self.is_open = False
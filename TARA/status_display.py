@@ -0,0 +1,100 @@
+"""Rate-limited console status for the TARA scripts.
+
+Printing every sample is one of the most expensive things the acquisition
+loop can do, especially on Windows consoles. StatusDisplay instead redraws a
+single status line from its own thread at a fixed rate, so the loop only
+updates a few counters and never waits on terminal I/O.
+"""
+import sys
+import threading
+import time
+
+import instrumentation
+
+STATUS_REFRESH_HZ = 4
+
+
+class StatusDisplay:
+    """Redraw render() on one console line at refresh_hz until stopped"""
+    def __init__(self, render, refresh_hz=STATUS_REFRESH_HZ, stream=None):
+        self.render = render
+        self.interval = 1.0 / refresh_hz
+        self.stream = stream or sys.stdout
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.width = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='status-display', daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.draw()
+
+    def draw(self):
+        with instrumentation.stage('status_draw'):
+            try:
+                text = self.render()
+            except Exception as e:  # A status glitch must never stop acquisition
+                text = f"(status unavailable: {e})"
+            # Pad to overwrite leftovers of a longer previous line
+            self.stream.write('\r' + text.ljust(self.width))
+            self.stream.flush()
+            self.width = len(text)
+
+    def stop(self):
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.draw()
+        self.stream.write('\n')
+        self.stream.flush()
+
+
+class AcquisitionStatus:
+    """Logger tracker that keeps the counters shown on the status line.
+
+    add_batch() only looks at the last sample of each batch, so its cost does
+    not depend on the batch size.
+    """
+    def __init__(self, output, cycle_stats=None):
+        self.output = output
+        self.cycle_stats = cycle_stats
+        self.lines = 0
+        self.last_cycle = None
+        self.last_force = None
+        self.rate = 0.0
+        self.rate_lines = 0
+        self.rate_time = time.monotonic()
+
+    def add_batch(self, batch):
+        self.lines += len(batch)
+        if len(batch):
+            self.last_cycle = int(batch.cycle[-1])
+            self.last_force = float(batch.force[-1])
+
+    def render(self):
+        now = time.monotonic()
+        if now - self.rate_time >= 1.0:
+            self.rate = (self.lines - self.rate_lines) / (now - self.rate_time)
+            self.rate_lines = self.lines
+            self.rate_time = now
+        parts = [f"Cycle {self.last_cycle if self.last_cycle is not None else '-'}",
+                 f"{self.rate:7.0f} lines/s"]
+        if self.last_force is not None:
+            parts.append(f"Force {self.last_force:8.2f} N")
+        if self.cycle_stats is not None and self.cycle_stats.last_peak is not None:
+            parts.append(f"Last peak {self.cycle_stats.last_peak:8.2f} N")
+        parts.append(f"Part {self.output.part}")
+        parts.append(f"{self.lines} lines")
+        return " | ".join(parts)
+
+    def close(self):
+        pass
+
+    def print_summary(self):
+        pass
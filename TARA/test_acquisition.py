@@ -0,0 +1,56 @@
+"""The vectorised and the per-line parser must agree on every batch"""
+import numpy as np
+import pytest
+
+from acquisition import MAX_CYCLE, _parse_lines_fast, _parse_lines_slow, parse_lines
+
+
+def assert_same(batch, expected):
+    assert batch.lines == expected.lines
+    assert batch.malformed == expected.malformed
+    assert batch.gap_markers == expected.gap_markers
+    np.testing.assert_array_equal(batch.cycle, expected.cycle)
+    np.testing.assert_array_equal(batch.time_ms, expected.time_ms)
+    np.testing.assert_array_equal(batch.force, expected.force)
+
+
+@pytest.mark.parametrize('lines', [
+    ['1,2,3', '2,3.5,4.25'],
+    ['1,2,3', '2, ,4'],
+    ['1,2.5,3.5', '2,3,  '],
+    ['1,2,3', '2,,4'],
+    ['1,2,3', '2,3,'],
+    ['1,2,3', ''],
+    ['1,2,3', ' '],
+    ['1,2,3', ',,'],
+    ['1,2,3', ' , , '],
+    ['1,2,3', '2,3,4,'],
+    ['1,2,3', '2,3,4,5'],
+    ['1.0,2,3'],
+    ['-1,2,3'],
+    [' 1,2,3'],
+    ['1,nan,3'],
+    ['1, 2 ,3 '],
+    [f'{MAX_CYCLE},2,3', f'{MAX_CYCLE + 1},2,3'],
+    ['1,2,3', '#GAP,a,b,1,2,0', '2,3,4'],
+])
+def test_fast_matches_slow(lines):
+    fast = _parse_lines_fast(lines)
+    slow = _parse_lines_slow(lines)
+    if fast is not None:
+        assert_same(fast, slow)
+    assert_same(parse_lines(lines), slow)
+
+
+def test_blank_fields_are_malformed():
+    batch = parse_lines(['1,2,3', '2, ,4', '3,3,  ', '4,,5'])
+    assert batch.malformed == 3
+    assert batch.lines == ['1,2,3']
+    assert -1.0 not in batch.time_ms and -1.0 not in batch.force
+
+
+def test_extra_fields_are_ignored():
+    batch = parse_lines(['1,2,3,', '2,3,4,extra'])
+    assert batch.malformed == 0
+    assert batch.cycle.tolist() == [1, 2]
+    assert batch.force.tolist() == [3.0, 4.0]